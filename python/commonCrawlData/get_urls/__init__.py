@@ -4,7 +4,31 @@
 import logging
 import azure.functions as func
 import json
+import os
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from urllib.parse import urlparse
+
+# Base URL can point at a local stand-in for the Common Crawl index
+COMMONCRAWL_INDEX_URL = os.environ.get(
+    "COMMONCRAWL_INDEX_URL", "https://index.commoncrawl.org"
+).rstrip("/")
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+
+# Index pages fetched at once; the index server rate-limits aggressively
+max_concurrent_pages = int(os.environ.get("INDEX_FETCH_CONCURRENCY", "2"))
+
+# Only captures that can hold schema.org markup are worth a WARC fetch
+HTML_MIME_TYPES = {"text/html", "application/xhtml+xml"}
+
+http_session = None
+http_session_lock = threading.Lock()
 
 
 def main(params: str) -> list:
@@ -18,32 +42,190 @@ def main(params: str) -> list:
     limit = params.get("limit", 100)
     crawl_id = params.get("crawl_id", "2025-13")
     url_prefix = params.get("url_prefix", "")
+    page = params.get("page")
 
     if not url_prefix:
         return {"status": "error", "message": "No URL search query provided"}
 
+    if params.get("count_pages"):
+        return get_num_pages(crawl_id, url_prefix)
+
+    if page is not None:
+        logging.info(f"Getting up to {limit} URLs from page {page} of crawl {crawl_id}")
+        return get_urls_page(limit, crawl_id, url_prefix, int(page))
+
     logging.info(f"Getting up to {limit} URLs from crawl {crawl_id}")
     return get_urls(limit, crawl_id, url_prefix)
 
 
-def get_urls(limit, crawl_id, url_prefix):
-    """Query Common Crawl index for restaurant URLs"""
-    # Common Crawl index URL pattern
-    cc_index_url = f"https://index.commoncrawl.org/CC-MAIN-{crawl_id}-index"
-    query = f"{url_prefix}*"
+def get_http_session():
+    """One pooled HTTP session per worker process, with backoff on rate limiting"""
+    global http_session
+    with http_session_lock:
+        if http_session is None:
+            session = requests.Session()
+            retries = Retry(
+                total=5,
+                backoff_factor=2,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET"],
+            )
+            adapter = HTTPAdapter(
+                max_retries=retries, pool_maxsize=max(max_concurrent_pages, 1)
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["User-Agent"] = USER_AGENT
+            http_session = session
+    return http_session
 
-    logging.info(f"Querying Common Crawl index: {cc_index_url}")
-    logging.info(f"Query: {query}")
 
-    response = requests.get(
-        cc_index_url + "?" + "url=" + query + "&output=json&limit=" + str(limit)
+def get_index_url(crawl_id):
+    """CDX endpoint of one crawl"""
+    return f"{COMMONCRAWL_INDEX_URL}/CC-MAIN-{crawl_id}-index"
+
+
+def get_num_pages(crawl_id, url_prefix):
+    """Number of index pages holding captures of url_prefix (showNumPages)"""
+    cc_index_url = get_index_url(crawl_id)
+    response = get_http_session().get(
+        cc_index_url,
+        params={"url": f"{url_prefix}*", "output": "json", "showNumPages": "true"},
+        timeout=60,
     )
 
     if response.status_code != 200:
-        logging.error(f"Error querying index: {response.status_code}")
-        return []
+        logging.error(f"Error querying index page count: {response.status_code}")
+        return 0
+
+    pages = response.json()
+    num_pages = int(pages["pages"] if isinstance(pages, dict) else pages)
+    logging.info(f"Index has {num_pages} pages for {url_prefix}* in {cc_index_url}")
+    return num_pages
+
+
+def iter_index_page(crawl_id, url_prefix, page, limit=None):
+    """Yield the capture records of one index page as they stream in"""
+    params = {"url": f"{url_prefix}*", "output": "json", "page": page}
+    if limit is not None:
+        params["limit"] = limit
+
+    with get_http_session().get(
+        get_index_url(crawl_id), params=params, stream=True, timeout=60
+    ) as response:
+        if response.status_code == 404:
+            # No captures on this page
+            return
+        if response.status_code != 200:
+            logging.error(f"Error querying index page {page}: {response.status_code}")
+            return
+
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+
+
+def get_urls_page(limit, crawl_id, url_prefix, page):
+    """Up to limit capture records from one index page, deduplicated"""
+    records = list(islice(iter_index_page(crawl_id, url_prefix, page, limit), limit))
+    return dedupe_captures(records)
+
+
+def is_html_capture(record):
+    """Whether the index says the capture is a 200 HTML response"""
+    mime = record.get("mime-detected") or record.get("mime", "")
+    return str(record.get("status")) == "200" and mime.lower() in HTML_MIME_TYPES
+
+
+def capture_key(record):
+    """
+    Canonical URL of a capture: the index's SURT key (no scheme, no www, host
+    lower-cased) without a trailing slash, so http/https and /page vs /page/
+    captures of one page share a key.
+    """
+    urlkey = record.get("urlkey")
+    if not urlkey:
+        parsed = urlparse(record.get("url", ""))
+        host = parsed.netloc.lower().removeprefix("www.")
+        urlkey = host + parsed.path + (f"?{parsed.query}" if parsed.query else "")
+    return urlkey.rstrip("/")
+
+
+def dedupe_captures(records, seen_keys=None, seen_digests=None):
+    """
+    Drop captures that are not 200 HTML, keep the newest capture of each
+    canonical URL, then drop captures whose content digest was already kept.
+    seen_keys and seen_digests carry state across calls and are updated.
+    """
+    seen_keys = set() if seen_keys is None else seen_keys
+    seen_digests = set() if seen_digests is None else seen_digests
+
+    newest = {}
+    for record in records:
+        if not is_html_capture(record):
+            continue
+        key = capture_key(record)
+        if key in seen_keys:
+            continue
+        kept = newest.get(key)
+        if kept is None or record.get("timestamp", "") > kept.get("timestamp", ""):
+            newest[key] = record
+
+    unique = []
+    for key, record in newest.items():
+        digest = record.get("digest")
+        if digest and digest in seen_digests:
+            continue
+        seen_keys.add(key)
+        if digest:
+            seen_digests.add(digest)
+        unique.append(record)
+    return unique
+
+
+def iter_urls(limit, crawl_id, url_prefix):
+    """
+    Yield up to limit deduplicated capture records for url_prefix, in index
+    order. A few pages are fetched ahead concurrently, so records of the first
+    page are available before the later pages have arrived.
+    """
+    num_pages = get_num_pages(crawl_id, url_prefix)
+    remaining = limit
+    seen_keys = set()
+    seen_digests = set()
+    next_page = 0
+    pending = deque()
+    page_window = max(max_concurrent_pages, 1)
+
+    with ThreadPoolExecutor(max_workers=page_window) as executor:
+        try:
+            while remaining > 0 and (pending or next_page < num_pages):
+                while next_page < num_pages and len(pending) < page_window:
+                    pending.append(
+                        executor.submit(
+                            get_urls_page, remaining, crawl_id, url_prefix, next_page
+                        )
+                    )
+                    next_page += 1
+
+                # Captures already taken from earlier pages do not count
+                page_records = dedupe_captures(
+                    pending.popleft().result(), seen_keys, seen_digests
+                )
+                for record in page_records[:remaining]:
+                    remaining -= 1
+                    yield record
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def get_urls(limit, crawl_id, url_prefix):
+    """Query Common Crawl index for restaurant URLs"""
+    logging.info(f"Querying Common Crawl index: {get_index_url(crawl_id)}")
+    logging.info(f"Query: {url_prefix}*")
 
-    cc_data = [json.loads(line) for line in response.text.strip().split("\n")]
+    cc_data = list(iter_urls(limit, crawl_id, url_prefix))
     logging.info(f"Found {len(cc_data)} matching URLs")
 
     return cc_data
@@ -20,6 +20,9 @@ async def main(req: func.HttpRequest, starter: str) -> func.HttpResponse:
     batch_size_param = req.params.get("batch_size")
     batch_size = int(batch_size_param) if batch_size_param else 50
 
+    index_concurrency_param = req.params.get("index_concurrency")
+    index_concurrency = int(index_concurrency_param) if index_concurrency_param else 2
+
     url_prefix_param = req.params.get("url_prefix")
     if not url_prefix_param:
         return {"status": "error", "message": "No URL search query provided"}
@@ -39,6 +42,7 @@ async def main(req: func.HttpRequest, starter: str) -> func.HttpResponse:
             "crawl_id": crawl_id,
             "batch_size": batch_size,
             "url_prefix": url_prefix,
+            "index_concurrency": index_concurrency,
         },
     )
 
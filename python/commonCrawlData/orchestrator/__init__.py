@@ -7,6 +7,7 @@ import azure.functions as func
 import azure.durable_functions as df
 from datetime import datetime
 import tldextract
+from get_urls import dedupe_captures
 
 
 def orchestrator_function(context: df.DurableOrchestrationContext):
@@ -21,36 +22,91 @@ def orchestrator_function(context: df.DurableOrchestrationContext):
     if not url_prefix:
         return {"status": "error", "message": "No URL search query provided"}
 
-    urls = yield context.call_activity(
+    index_concurrency = params.get("index_concurrency", 2)
+
+    num_pages = yield context.call_activity(
         "get_urls",
-        {"limit": total_limit, "crawl_id": crawl_id, "url_prefix": url_prefix},
+        {"count_pages": True, "crawl_id": crawl_id, "url_prefix": url_prefix},
     )
 
-    if not urls or len(urls) == 0:
+    if not num_pages:
         return {"status": "error", "message": f"No {url_prefix} URLs found"}
 
-    # Process URLs in batches
-    batches = []
-    for i in range(0, len(urls), batch_size):
-        batches.append(urls[i : i + batch_size])
+    # Index pages are fetched a few at a time and read in page order as they
+    # come in. Their URLs are batched right away; batch tasks stay outstanding
+    # while the rest of the index is read and are joined once at the end.
+    urls = []
+    seen_keys = set()
+    seen_digests = set()
+    unbatched = []
+    page_tasks = []
+    batch_tasks = []
+    new_batch_tasks = []
+    next_page = 0
+
+    while True:
+        while page_tasks and page_tasks[0].is_completed:
+            # Already done, so this returns the page (or raises its error) at once
+            page_urls = yield page_tasks.pop(0)
+            # Pages come back deduplicated; this drops captures already taken
+            # from earlier pages before any WARC bytes are fetched
+            page_urls = dedupe_captures(page_urls or [], seen_keys, seen_digests)
+            page_urls = page_urls[: total_limit - len(urls)]
+            urls.extend(page_urls)
+            unbatched.extend(page_urls)
+
+        if len(urls) >= total_limit:
+            # Pages still being fetched are not needed anymore
+            page_tasks = []
+
+        while (
+            next_page < num_pages
+            and len(urls) < total_limit
+            and sum(not task.is_completed for task in page_tasks) < index_concurrency
+        ):
+            page_tasks.append(
+                context.call_activity(
+                    "get_urls",
+                    {
+                        "limit": total_limit - len(urls),
+                        "crawl_id": crawl_id,
+                        "url_prefix": url_prefix,
+                        "page": next_page,
+                    },
+                )
+            )
+            next_page += 1
+
+        while len(unbatched) >= batch_size or (unbatched and not page_tasks):
+            batch, unbatched = unbatched[:batch_size], unbatched[batch_size:]
+            batch_number = len(batch_tasks) + len(new_batch_tasks) + 1
+            new_batch_tasks.append(
+                context.call_activity(
+                    "process_url_batch",
+                    {
+                        "batch": batch,
+                        "batch_number": batch_number,
+                    },
+                )
+            )
 
-    logging.info(f"Split {len(urls)} URLs into {len(batches)} batches")
+        if not page_tasks:
+            break
 
-    # Process batches in parallel
-    tasks = []
-    for i, batch in enumerate(batches):
-        task = context.call_activity(
-            "process_url_batch",
-            {
-                "batch": batch,
-                "batch_number": i + 1,
-                "total_batches": len(batches),
-            },
+        # Wait for the next page. A task is only scheduled once it is yielded,
+        # so new batch tasks go along, but a finished batch just loops again
+        yield context.task_any(
+            [task for task in page_tasks if not task.is_completed] + new_batch_tasks
         )
-        tasks.append(task)
+        batch_tasks.extend(new_batch_tasks)
+        new_batch_tasks = []
 
-    # Wait for all batches to complete
-    batch_results = yield context.task_all(tasks)
+    if not urls:
+        return {"status": "error", "message": f"No {url_prefix} URLs found"}
+
+    batch_results = yield context.task_all(batch_tasks + new_batch_tasks)
+
+    logging.info(f"Split {len(urls)} URLs into {len(batch_results)} batches")
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     parsed_url = tldextract.extract(url_prefix)
@@ -4,10 +4,10 @@
 import logging
 import azure.functions as func
 import json
+import os
 import re
 import requests
-import gzip
-import io
+import codecs
 from warcio.archiveiterator import ArchiveIterator
 import extruct
 from w3lib.html import get_base_url
@@ -17,11 +17,163 @@ from urllib.parse import urlparse
 import time
 from datetime import datetime, timedelta
 import random
+import threading
+import queue
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import partial
 
 dns_failures = 0
 dns_failure_threshold = 5
 circuit_breaker_active = False
 circuit_breaker_reset_time = None
+circuit_breaker_lock = threading.Lock()
+
+# Base URLs can point at a local stand-in for Common Crawl
+COMMONCRAWL_DATA_URL = os.environ.get(
+    "COMMONCRAWL_DATA_URL", "https://data.commoncrawl.org"
+).rstrip("/")
+COMMONCRAWL_INDEX_URL = os.environ.get(
+    "COMMONCRAWL_INDEX_URL", "https://index.commoncrawl.org"
+).rstrip("/")
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+
+# WARC records fetched at once by a batch, and at most per host
+max_concurrent_fetches = int(os.environ.get("WARC_FETCH_CONCURRENCY", "16"))
+max_fetches_per_host = int(os.environ.get("WARC_FETCH_PER_HOST", "8"))
+# The index server rate-limits aggressively, so redirect lookups stay few
+host_fetch_limits = {urlparse(COMMONCRAWL_INDEX_URL).hostname: 2}
+
+# Records of one WARC file at most this many bytes apart share a ranged GET,
+# as long as the merged range stays under the byte cap
+warc_range_max_gap = int(os.environ.get("WARC_RANGE_MAX_GAP", str(64 * 1024)))
+warc_range_max_bytes = int(
+    os.environ.get("WARC_RANGE_MAX_BYTES", str(8 * 1024 * 1024))
+)
+
+# Pages are parsed in a process pool fed from a bounded queue of fetched pages;
+# 0 workers parses them in the activity's own thread
+extract_workers = int(os.environ.get("WARC_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+extract_queue_size = int(os.environ.get("WARC_EXTRACT_QUEUE", "32"))
+
+# Page bodies are decoded in chunks and truncated past this many bytes
+max_html_bytes = int(os.environ.get("WARC_MAX_HTML_BYTES", str(5 * 1024 * 1024)))
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Markers scanned for (plain substring checks) before a page is handed to
+# extruct: a syntax only runs when its attribute and one of the type names it
+# could match are both present. Attribute names are matched in lower case,
+# since HTML does not care about their case.
+JSONLD_TYPES = ["Restaurant", "FoodEstablishment", "LocalBusiness"]
+RESTAURANT_TYPES = ["Restaurant", "FoodEstablishment"]
+MICRODATA_MARKER = "itemtype"
+RDFA_MARKER = "typeof"
+# Elements whose content an HTML parser keeps as text, so a <script> inside
+# one is not a script (the list lxml, and so extruct, follows)
+HTML_RAW_TEXT_TAGS = [
+    "style",
+    "textarea",
+    "title",
+    "xmp",
+    "iframe",
+    "noembed",
+    "noframes",
+]
+# Scripts, comments and raw text elements in document order, each one whole,
+# so scripts that are only text are skipped. The lookahead on the first letter
+# keeps most other tags from trying every branch.
+HTML_SCRIPT_SCAN_RE = re.compile(
+    r"<(?=[!sStTxXiInNpP])(?:"
+    r"!--(?:-?>|.*?(?:--!?>|\Z))"
+    r"|(?i:script)(?=[\s/>])(?P<attrs>[^>]*)>(?P<body>.*?)(?:</(?i:script)\s*>|\Z)"
+    + "".join(
+        rf"|(?i:{tag})(?=[\s/>])[^>]*>.*?(?:</(?i:{tag})\s*>|\Z)"
+        for tag in HTML_RAW_TEXT_TAGS
+    )
+    + r"|(?i:plaintext)(?=[\s/>]).*"
+    r")",
+    re.DOTALL,
+)
+# The script type extruct reads JSON-LD from (exactly application/ld+json)
+JSONLD_TYPE_RE = re.compile(
+    r"\s(?i:type)\s*=\s*([\"']?)application/ld\+json\1(?=[\s/]|$)"
+)
+TEMPLATE_TAG_RE = re.compile(r"<(?i:template)(?=[\s/>])")
+
+http_session = None
+http_session_lock = threading.Lock()
+extract_pool = None
+extract_pool_lock = threading.Lock()
+metrics_lock = threading.Lock()
+host_semaphores = {}
+host_semaphores_lock = threading.Lock()
+
+
+def get_http_session():
+    """One pooled HTTP session per worker process, shared by every fetch"""
+    global http_session
+    with http_session_lock:
+        if http_session is None:
+            session = requests.Session()
+            retries = Retry(
+                total=5,
+                backoff_factor=1,
+                status_forcelist=[500, 502, 503, 504],
+                allowed_methods=["GET"],
+            )
+            adapter = HTTPAdapter(
+                max_retries=retries,
+                pool_connections=4,
+                pool_maxsize=max_concurrent_fetches,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["User-Agent"] = USER_AGENT
+            http_session = session
+    return http_session
+
+
+def get_extract_pool():
+    """
+    One process pool per worker process for schema extraction. Its processes
+    are spawned, not forked, since this process runs fetch threads (and the
+    functions host's own threads) whose locks a fork would copy mid-use.
+    """
+    global extract_pool
+    with extract_pool_lock:
+        if extract_pool is None:
+            extract_pool = ProcessPoolExecutor(
+                max_workers=extract_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+    return extract_pool
+
+
+def reset_extract_pool(pool):
+    """Drop a pool that cannot take pages anymore, so the next page starts a new one"""
+    global extract_pool
+    with extract_pool_lock:
+        if extract_pool is pool:
+            extract_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@contextmanager
+def host_slot(url):
+    """Hold one of the concurrent request slots for the URL's host"""
+    host = urlparse(url).hostname
+    with host_semaphores_lock:
+        semaphore = host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(
+                host_fetch_limits.get(host, max_fetches_per_host)
+            )
+            host_semaphores[host] = semaphore
+    with semaphore:
+        yield
 
 
 def main(params: str) -> dict:
@@ -36,111 +188,73 @@ def main(params: str) -> dict:
     batch_number = params.get("batch_number", 0)
     total_batches = params.get("total_batches", 0)
 
-    logging.info(
-        f"Processing batch {batch_number}/{total_batches} with {len(batch)} URLs"
-    )
+    # The orchestrator batches index pages as they arrive, so the total may be unknown
+    batch_label = f"{batch_number}/{total_batches}" if total_batches else batch_number
+    logging.info(f"Processing batch {batch_label} with {len(batch)} URLs")
 
-    results = process_urls(batch)
+    metrics = {}
+    results = process_urls(batch, metrics)
     return {
         "batch_number": batch_number,
         "total_urls": len(batch),
         "results": results,
         "extracted_count": len(results),
+        "metrics": metrics,
     }
 
 
-def download_and_extract_warc(warc_record, redirect_handled=False):
-    """Download and extract content from a WARC record with robust retry logic and single redirect follow."""
-    offset, length = int(warc_record["offset"]), int(warc_record["length"])
-    warc_filename = warc_record["filename"]
-
-    session = requests.Session()
-    retries = Retry(
-        total=5,
-        backoff_factor=1,
-        status_forcelist=[500, 502, 503, 504],
-        allowed_methods=["GET"],
-    )
-    session.mount("https://", HTTPAdapter(max_retries=retries))
+def plan_warc_ranges(records, max_gap=None, max_bytes=None):
+    """
+    Group WARC records into ranged GETs: per WARC file, in offset order, a record
+    joins the previous range when the gap to it is at most max_gap bytes and the
+    merged range stays within max_bytes.
+    Returns a list of (filename, start, end, record indexes), end inclusive.
+    """
+    max_gap = warc_range_max_gap if max_gap is None else max_gap
+    max_bytes = warc_range_max_bytes if max_bytes is None else max_bytes
+
+    indexes_by_file = {}
+    for index, record in enumerate(records):
+        indexes_by_file.setdefault(record["filename"], []).append(index)
+
+    warc_ranges = []
+    for warc_filename, indexes in indexes_by_file.items():
+        indexes.sort(key=lambda index: int(records[index]["offset"]))
+        current = None
+        for index in indexes:
+            start = int(records[index]["offset"])
+            end = start + int(records[index]["length"]) - 1
+            if (
+                current
+                and start - current[2] - 1 <= max_gap
+                and max(end, current[2]) - current[1] + 1 <= max_bytes
+            ):
+                current[2] = max(current[2], end)
+                current[3].append(index)
+            else:
+                current = [warc_filename, start, end, [index]]
+                warc_ranges.append(current)
+    return [tuple(warc_range) for warc_range in warc_ranges]
+
+
+def request_warc_range(url, start, end):
+    """Streamed ranged GET of bytes start..end (inclusive), with retries on DNS errors"""
+    session = get_http_session()
 
     headers = {
-        "Range": f"bytes={offset}-{offset+length-1}",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+        "Range": f"bytes={start}-{end}",
     }
 
-    url = f"https://data.commoncrawl.org/{warc_filename}"
-
     for attempt in range(3):
         try:
             logging.info(f"Attempt {attempt+1} downloading from: {url}")
-            response = session.get(url, headers=headers, timeout=30)
+            response = session.get(url, headers=headers, timeout=30, stream=True)
 
             if response.status_code != 206:
                 logging.warning(f"Got status code {response.status_code} from {url}")
-                break
-
-            warc_content = io.BytesIO(response.content)
-            for record in ArchiveIterator(warc_content):
-                if record.rec_type != "response":
-                    continue
-
-                status = record.http_headers.get_statuscode()
-                target_uri = record.rec_headers.get_header("WARC-Target-URI")
-                content_type = record.http_headers.get_header(
-                    "Content-Type", ""
-                ).lower()
-
-                if status in ["301", "302"] and not redirect_handled:
-                    logging.info(f"Received a redirect request for: {target_uri}")
-                    logging.info(f"HTTP status: {status}")
-                    logging.info(f"Content-Type: {content_type}")
-
-                    location = record.http_headers.get_header("Location")
-                    if location:
-                        if location.startswith("/"):
-                            parsed_url = urlparse(target_uri)
-                            location = (
-                                f"{parsed_url.scheme}://{parsed_url.netloc}location"
-                            )
-                        if location.startswith("http://"):
-                            location = location.replace("http://", "https://", 1)
-
-                        logging.info(f"Following redirect to: {location}")
-                        # delay between 301 and redirect lookup
-                        time.sleep(random.uniform(0.5, 1.5))
-                        redirected = lookup_redirected_warc(location)
-                        if redirected:
-                            return download_and_extract_warc(
-                                redirected, redirect_handled=True
-                            )
-                        else:
-                            logging.warning("Redirected WARC not found.")
-                    continue
-
-                if "html" not in content_type:
-                    logging.info("Skipping non-HTML content.")
-                    continue
-
-                raw_stream = record.content_stream().read()
-                if not raw_stream:
-                    logging.warning("Record content stream is empty.")
-                    continue
-
-                if record.http_headers.get_header("Content-Encoding") == "gzip":
-                    try:
-                        raw_stream = gzip.decompress(raw_stream)
-                    except Exception as e:
-                        logging.warning(f"Failed to decompress: {e}")
-                        continue
-
-                try:
-                    html_content = raw_stream.decode("utf-8", errors="replace")
-                    return html_content
-                except Exception as e:
-                    logging.warning(f"Failed to decode: {e}")
-                    continue
-
-            break  # Break out of retry loop if successful
+                response.close()
+                return None
+            return response
 
         except requests.exceptions.ConnectionError as e:
             if "NameResolutionError" in str(e):
@@ -158,9 +272,132 @@ def download_and_extract_warc(warc_record, redirect_handled=False):
     return None
 
 
+@contextmanager
+def open_warc_range(warc_filename, start, end):
+    """
+    Open bytes start..end (inclusive) of a WARC file as a stream; yields the
+    response, or None when the fetch failed. The body is read straight off the
+    connection, and whatever is left unread when the block exits is dropped.
+    """
+    url = f"{COMMONCRAWL_DATA_URL}/{warc_filename}"
+    with host_slot(url):
+        response = request_warc_range(url, start, end)
+        try:
+            yield response
+        finally:
+            if response is not None:
+                response.close()
+
+
+def download_and_extract_warc(warc_record, redirect_handled=False):
+    """Download and extract content from a WARC record, with a single redirect follow."""
+    offset, length = int(warc_record["offset"]), int(warc_record["length"])
+    with open_warc_range(
+        warc_record["filename"], offset, offset + length - 1
+    ) as response:
+        if response is None:
+            return None
+        try:
+            html_content, location = extract_html_from_warc(response.raw)
+        except Exception as e:
+            logging.error(f"Unexpected error: {e}")
+            return None
+
+    # Followed once the range is closed, so its host slot is free again
+    if location and not redirect_handled:
+        return follow_redirect(location)
+    return html_content
+
+
+def follow_redirect(location):
+    """HTML of the capture a redirect points to, without following further redirects"""
+    logging.info(f"Following redirect to: {location}")
+    # delay between 301 and redirect lookup
+    time.sleep(random.uniform(0.5, 1.5))
+    redirected = lookup_redirected_warc(location)
+    if not redirected:
+        logging.warning("Redirected WARC not found.")
+        return None
+    return download_and_extract_warc(redirected, redirect_handled=True)
+
+
+def extract_html_from_warc(warc_stream):
+    """(html, redirect location) of the first HTML or redirect record in warc_stream"""
+    for record in ArchiveIterator(warc_stream):
+        html_content, location = extract_html_from_record(record)
+        if html_content or location:
+            return html_content, location
+    return None, None
+
+
+def extract_html_from_record(record):
+    """
+    (html, None) for an HTML response record, (None, location) for a redirect,
+    (None, None) otherwise. Redirects are left to the caller, which follows
+    them after closing the range the record came from.
+    """
+    if record.rec_type != "response":
+        return None, None
+
+    status = record.http_headers.get_statuscode()
+    target_uri = record.rec_headers.get_header("WARC-Target-URI")
+    content_type = record.http_headers.get_header("Content-Type", "").lower()
+
+    if status in ["301", "302"]:
+        logging.info(f"Received a redirect request for: {target_uri}")
+        logging.info(f"HTTP status: {status}")
+        logging.info(f"Content-Type: {content_type}")
+
+        location = record.http_headers.get_header("Location")
+        if location:
+            if location.startswith("/"):
+                parsed_url = urlparse(target_uri)
+                location = f"{parsed_url.scheme}://{parsed_url.netloc}{location}"
+            if location.startswith("http://"):
+                location = location.replace("http://", "https://", 1)
+        return None, location
+
+    # Decided on the headers alone, before any of the body is read
+    if "html" not in content_type:
+        logging.info("Skipping non-HTML content.")
+        return None, None
+
+    html_content = read_record_html(record)
+    if not html_content:
+        logging.warning("Record content stream is empty.")
+        return None, None
+    return html_content, None
+
+
+def read_record_html(record):
+    """
+    Decode the body of a response record as UTF-8, chunk by chunk, keeping at
+    most max_html_bytes. warcio undoes chunked transfer and gzip/deflate
+    content encodings as the body streams.
+    """
+    content_stream = record.content_stream()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parts = []
+    size = 0
+    while size < max_html_bytes:
+        chunk = content_stream.read(min(STREAM_CHUNK_SIZE, max_html_bytes - size))
+        if not chunk:
+            break
+        size += len(chunk)
+        parts.append(decoder.decode(chunk))
+    else:
+        if content_stream.read(1):
+            target_uri = record.rec_headers.get_header("WARC-Target-URI")
+            logging.warning(
+                f"Truncated page body at {max_html_bytes} bytes: {target_uri}"
+            )
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+
 def lookup_redirected_warc(url, crawl_id="2025-13"):
     cc_index_url = (
-        f"https://index.commoncrawl.org/CC-MAIN-{crawl_id}-index?url={url}&output=json"
+        f"{COMMONCRAWL_INDEX_URL}/CC-MAIN-{crawl_id}-index?url={url}&output=json"
     )
 
     for attempt in range(5):
@@ -169,7 +406,10 @@ def lookup_redirected_warc(url, crawl_id="2025-13"):
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
                 "Accept": "application/json",
             }
-            response = requests.get(cc_index_url, timeout=10, headers=headers)
+            with host_slot(cc_index_url):
+                response = get_http_session().get(
+                    cc_index_url, timeout=10, headers=headers
+                )
             if response.status_code == 200:
                 results = [
                     json.loads(line) for line in response.text.strip().splitlines()
@@ -215,67 +455,106 @@ def correct_swapped_address_fields(address):
     return address
 
 
-def extract_schema_data(html, url):
-    """Extract schema.org data from HTML"""
-    if not html:
+def parse_jsonld_scripts(html):
+    """
+    Items of the page's JSON-LD scripts, parsed without building an HTML tree.
+    Scripts inside comments and raw text elements such as <textarea> are
+    skipped, as an HTML parser would. None when a script is not plain JSON,
+    so extruct (which also accepts commented JSON) has to read them instead,
+    and for pages with <template> elements, left to the parser as well.
+    """
+    if TEMPLATE_TAG_RE.search(html):
         return None
 
-    # Get base URL for potential relative URL resolution
-    base_url = get_base_url(html, url)
-
-    # Extract all structured data (JSON-LD, Microdata, RDFa, etc.)
-    data = extruct.extract(
-        html, base_url=base_url, syntaxes=["json-ld", "microdata", "rdfa"]
-    )
-
-    # Find restaurant schema data (look in json-ld first as it's most common)
-    restaurant_data = None
-
-    # Check JSON-LD format first (most common for schema.org)
-    for item in data.get("json-ld", []):
-        item_type = item.get("@type", "")
+    items = []
+    # JSON-LD is mostly in the <head>; nothing past the last script type can match
+    last_jsonld = html.rfind("application/ld+json")
+    for match in HTML_SCRIPT_SCAN_RE.finditer(html):
+        if match.start() > last_jsonld:
+            break
+        attrs = match.group("attrs")
+        if attrs is None or not JSONLD_TYPE_RE.search(attrs):
+            continue
+        try:
+            data = json.loads(match.group("body"), strict=False)
+        except ValueError:
+            return None
+        if isinstance(data, list):
+            items.extend(item for item in data if item)
+        elif isinstance(data, dict) and data:
+            items.append(data)
+    return items
+
+
+def find_typed_item(items, type_key, is_match):
+    """First item whose type (or one of its types) passes is_match"""
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        item_type = item.get(type_key, "")
         if isinstance(item_type, list):
             types = item_type
         else:
             types = [item_type]
 
-        if any(
-            t in ["Restaurant", "FoodEstablishment", "LocalBusiness"] for t in types
-        ):
-            restaurant_data = item
-            break
+        if any(isinstance(t, str) and is_match(t) for t in types):
+            return item
+    return None
 
-    # If not found in JSON-LD, check microdata
-    if not restaurant_data:
-        for item in data.get("microdata", []):
-            item_type = item.get("type", "")
-            if isinstance(item_type, list):
-                types = item_type
-            else:
-                types = [item_type]
 
-            if any(
-                t.endswith("Restaurant") or t.endswith("FoodEstablishment")
-                for t in types
-            ):
-                restaurant_data = item
-                break
+def is_jsonld_restaurant(item_type):
+    return item_type in JSONLD_TYPES
 
-    # Finally check RDFa if needed
-    if not restaurant_data:
-        for item in data.get("rdfa", []):
-            item_type = item.get("type", "")
-            if isinstance(item_type, list):
-                types = item_type
-            else:
-                types = [item_type]
 
-            if any(
-                t.endswith("Restaurant") or t.endswith("FoodEstablishment")
-                for t in types
-            ):
-                restaurant_data = item
-                break
+def is_restaurant_type(item_type):
+    return item_type.endswith("Restaurant") or item_type.endswith("FoodEstablishment")
+
+
+def extract_schema_data(html, url):
+    """Extract schema.org data from HTML"""
+    if not html:
+        return None
+
+    # Most pages name none of the restaurant types anywhere; skip parsing them
+    if not any(type_name in html for type_name in JSONLD_TYPES):
+        return None
+
+    restaurant_data = None
+    syntaxes = []
+
+    # Check JSON-LD format first (most common for schema.org). Plain JSON
+    # scripts are parsed directly; a match there needs no HTML tree at all
+    if "application/ld+json" in html:
+        jsonld_items = parse_jsonld_scripts(html)
+        if jsonld_items is None:
+            syntaxes.append("json-ld")
+        else:
+            restaurant_data = find_typed_item(
+                jsonld_items, "@type", is_jsonld_restaurant
+            )
+
+    # Microdata and RDFa only match Restaurant/FoodEstablishment types
+    if not restaurant_data and any(t in html for t in RESTAURANT_TYPES):
+        lowered_html = html.lower()
+        if MICRODATA_MARKER in lowered_html:
+            syntaxes.append("microdata")
+        if RDFA_MARKER in lowered_html:
+            syntaxes.append("rdfa")
+
+    if not restaurant_data and syntaxes:
+        # Get base URL for potential relative URL resolution
+        base_url = get_base_url(html, url)
+
+        # Extract the structured data syntaxes that can still match
+        data = extruct.extract(html, base_url=base_url, syntaxes=syntaxes)
+
+        restaurant_data = (
+            find_typed_item(data.get("json-ld", []), "@type", is_jsonld_restaurant)
+            # If not found in JSON-LD, check microdata
+            or find_typed_item(data.get("microdata", []), "type", is_restaurant_type)
+            # Finally check RDFa if needed; extruct gives RDFa types as "@type"
+            or find_typed_item(data.get("rdfa", []), "@type", is_restaurant_type)
+        )
 
     host = urlparse(url).hostname
     if restaurant_data and host.endswith(".opentable.com"):
@@ -287,6 +566,11 @@ def extract_schema_data(html, url):
 
 
 def check_circuit_breaker():
+    with circuit_breaker_lock:
+        return update_circuit_breaker()
+
+
+def update_circuit_breaker():
     global circuit_breaker_active, circuit_breaker_reset_time, dns_failures
 
     # If circuit breaker is active, check if enough time has passed to reset it
@@ -308,38 +592,242 @@ def check_circuit_breaker():
     return False
 
 
-def process_urls(urls):
-    """Process a batch of URLs and extract schema.org data"""
-    results = []
+def add_metrics(metrics, stage, **counts):
+    """Add counts to one stage's metrics; safe to call from any stage thread"""
+    with metrics_lock:
+        stage_metrics = metrics.setdefault(stage, {})
+        for name, value in counts.items():
+            stage_metrics[name] = stage_metrics.get(name, 0) + value
 
-    for i, record in enumerate(urls):
-        if check_circuit_breaker():
-            logging.warning("Circuit breaker active. Pausing processing.")
-            break
+
+def fetch_warc_range_pages(records, html_queue, metrics, stopping, warc_range):
+    """
+    Fetch stage: stream one planned range and queue (record indexes, url, html)
+    for each record in it. Blocks while the extract stage is behind, and
+    returns early once stopping is set.
+    """
+    global dns_failures
+    warc_filename, start, end, indexes = warc_range
+    if stopping.is_set():
+        return
+    if check_circuit_breaker():
+        logging.warning("Circuit breaker active. Skipping range.")
+        return
+
+    if len(indexes) > 1:
+        logging.info(
+            f"Fetching {len(indexes)} records from {warc_filename} in one request"
+        )
+    # Records wanted from this range, by offset from the range start
+    wanted = {}
+    for index in indexes:
+        wanted.setdefault(int(records[index]["offset"]) - start, []).append(index)
+    redirects = []
+
+    with open_warc_range(warc_filename, start, end) as response:
+        if response is None:
+            return
         try:
-            url = record["url"]
-            logging.info(f"Processing {i+1}/{len(urls)}: {url}")
-
-            # Download and extract HTML content
-            html = download_and_extract_warc(record)
-            if not html:
-                logging.warning("  Failed to extract HTML")
-                continue
-
-            # Extract schema.org data
-            schema_data = extract_schema_data(html, url)
-            if schema_data:
-                # Add the source URL to the data
-                schema_data["_source_url"] = url
-                results.append(schema_data)
-                logging.info(f"  Successfully extracted schema data")
-            else:
-                logging.info("  No restaurant schema data found")
+            # The range is streamed record by record; the other records in the
+            # gaps between wanted ones are skipped without being kept
+            archive = ArchiveIterator(response.raw)
+            for warc_record in archive:
+                record_indexes = wanted.pop(archive.offset, None)
+                if record_indexes:
+                    url = records[record_indexes[0]]["url"]
+                    logging.info(
+                        f"Processing {record_indexes[0]+1}/{len(records)}: {url}"
+                    )
+                    html, location = extract_html_from_record(warc_record)
+                    if html:
+                        html_queue.put((record_indexes, url, html))
+                        add_metrics(metrics, "fetch", pages=1)
+                    elif location:
+                        redirects.append((record_indexes, url, location))
+                    else:
+                        logging.warning(f"  Failed to extract HTML: {url}")
+                if not wanted or stopping.is_set():
+                    break
         except requests.exceptions.ConnectionError as e:
+            logging.error(f"Connection error reading {warc_filename}: {e}")
             if "NameResolutionError" in str(e):
-                global dns_failures
-                dns_failures += 1
-                logging.warning(f"DNS failure count: {dns_failures}")
+                with circuit_breaker_lock:
+                    dns_failures += 1
+                    logging.warning(f"DNS failure count: {dns_failures}")
+        except Exception as e:
+            logging.error(f"Unexpected error reading {warc_filename}: {e}")
+        finally:
+            add_metrics(metrics, "fetch", requests=1, bytes=response.raw.tell())
+
+    # The index lookup and the fetch of the target take host slots of their
+    # own, so redirects are only followed after the range is closed
+    for record_indexes, url, location in redirects:
+        if stopping.is_set():
+            break
+        html = follow_redirect(location)
+        if html:
+            html_queue.put((record_indexes, url, html))
+            add_metrics(metrics, "fetch", pages=1)
+        else:
+            logging.warning(f"  Failed to extract HTML: {url}")
+
+
+def run_fetch_stage(records, warc_ranges, html_queue, metrics, stopping):
+    """Fetch every range on a thread pool, then queue None to end the extract stage"""
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max_concurrent_fetches) as executor:
+            list(
+                executor.map(
+                    partial(
+                        fetch_warc_range_pages, records, html_queue, metrics, stopping
+                    ),
+                    warc_ranges,
+                )
+            )
+    finally:
+        add_metrics(metrics, "fetch", seconds=time.perf_counter() - started)
+        html_queue.put(None)
+
+
+def extract_page(html, url):
+    """Extract stage task (runs in a pool process): schema data and seconds spent parsing"""
+    started = time.perf_counter()
+    schema_data = extract_schema_data(html, url)
+    return schema_data, time.perf_counter() - started
+
+
+def run_extract_stage(html_queue, metrics):
+    """
+    Parse queued pages until the fetch stage ends the queue; returns
+    {record index: schema data}. At most two pages per worker are handed to
+    the pool at once, so the queue (and the fetch stage) wait on the pool.
+    """
+    started = time.perf_counter()
+    extracted = {}
+    pending = []
+    in_flight = threading.BoundedSemaphore(max(extract_workers, 1) * 2)
+
+    def store(record_indexes, url, schema_data, seconds):
+        if schema_data:
+            # Add the source URL to the data
+            schema_data["_source_url"] = url
+            logging.info(f"  Successfully extracted schema data: {url}")
+        else:
+            logging.info(f"  No restaurant schema data found: {url}")
+        for index in record_indexes:
+            extracted[index] = schema_data
+        add_metrics(metrics, "extract", pages=1, busy_seconds=seconds)
+
+    def extract_here(record_indexes, url, html):
+        try:
+            store(record_indexes, url, *extract_page(html, url))
+        except Exception as e:
+            logging.error(f"  Failed to extract schema data: {url}: {e}")
+
+    while True:
+        item = html_queue.get()
+        if item is None:
+            break
+        record_indexes, url, html = item
+        if extract_workers == 0:
+            extract_here(record_indexes, url, html)
+            continue
+
+        in_flight.acquire()
+        pool = get_extract_pool()
+        try:
+            future = pool.submit(extract_page, html, url)
+        except Exception as e:
+            # A pool that refuses work (broken, or shut down) is replaced for
+            # the next page; this one is parsed here
+            logging.error(f"  Extract pool unavailable, parsing in this thread: {e}")
+            in_flight.release()
+            reset_extract_pool(pool)
+            extract_here(record_indexes, url, html)
+            continue
+        future.add_done_callback(lambda _: in_flight.release())
+        pending.append((record_indexes, url, pool, future))
+
+    wait([future for _, _, _, future in pending])
+    for record_indexes, url, pool, future in pending:
+        try:
+            store(record_indexes, url, *future.result())
+        except BrokenProcessPool as e:
+            # A worker died (e.g. out of memory); its pool cannot take more pages
+            reset_extract_pool(pool)
+            logging.error(f"  Failed to extract schema data: {url}: {e}")
+        except Exception as e:
+            logging.error(f"  Failed to extract schema data: {url}: {e}")
+    add_metrics(metrics, "extract", seconds=time.perf_counter() - started)
+    return extracted
+
+
+def log_stage_metrics(metrics):
+    """Log each stage's throughput, and add it to the metrics"""
+    fetch = metrics.setdefault("fetch", {})
+    extract = metrics.setdefault("extract", {})
+    fetch_seconds = fetch.get("seconds", 0) or 1e-9
+    extract_seconds = extract.get("seconds", 0) or 1e-9
+    fetch["pages_per_second"] = round(fetch.get("pages", 0) / fetch_seconds, 2)
+    fetch["mb_per_second"] = round(fetch.get("bytes", 0) / fetch_seconds / 1e6, 3)
+    extract["pages_per_second"] = round(extract.get("pages", 0) / extract_seconds, 2)
+    # Share of the pool's capacity spent parsing (wall time) while the batch ran
+    extract["utilization"] = round(
+        extract.get("busy_seconds", 0) / extract_seconds / max(extract_workers, 1), 3
+    )
+
+    logging.info(
+        f"Fetch stage: {fetch.get('pages', 0)} pages, {fetch.get('requests', 0)} requests, "
+        f"{fetch.get('bytes', 0) / 1e6:.1f} MB in {fetch_seconds:.2f}s "
+        f"({fetch['pages_per_second']} pages/s, {fetch['mb_per_second']} MB/s)"
+    )
+    logging.info(
+        f"Extract stage: {extract.get('pages', 0)} pages in {extract_seconds:.2f}s "
+        f"({extract['pages_per_second']} pages/s, "
+        f"{extract['utilization']:.0%} of {max(extract_workers, 1)} workers busy)"
+    )
+
 
+def process_urls(urls, metrics=None):
+    """Process a batch of URLs and extract schema.org data"""
+    metrics = {} if metrics is None else metrics
+    # Nearby records share one ranged GET; ranges are fetched concurrently over
+    # the pooled session. Fetched pages go through a bounded queue to the
+    # extract stage, so downloads and parsing overlap. Results keep batch order.
+    warc_ranges = plan_warc_ranges(urls)
+    logging.info(f"Fetching {len(urls)} WARC records in {len(warc_ranges)} requests")
+
+    html_queue = queue.Queue(maxsize=max(extract_queue_size, 1))
+    stopping = threading.Event()
+    fetch_errors = []
+
+    def fetch_stage():
+        try:
+            run_fetch_stage(urls, warc_ranges, html_queue, metrics, stopping)
+        except Exception as e:
+            fetch_errors.append(e)
+
+    fetch_thread = threading.Thread(target=fetch_stage, name="warc-fetch-stage")
+    fetch_thread.start()
+    try:
+        extracted = run_extract_stage(html_queue, metrics)
+    finally:
+        # Normally the fetch stage is done by now. If the extract stage failed,
+        # stop it and drain the queue, so no fetch thread stays blocked on a
+        # full queue while holding a host slot and an open response.
+        stopping.set()
+        while fetch_thread.is_alive():
+            try:
+                html_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        fetch_thread.join()
+    if fetch_errors:
+        raise fetch_errors[0]
+
+    results = [extracted[index] for index in sorted(extracted) if extracted[index]]
+
+    log_stage_metrics(metrics)
     logging.info(f"Extracted schema data for {len(results)} restaurants")
     return results
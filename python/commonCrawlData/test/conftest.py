@@ -0,0 +1,168 @@
+# Copyright (c) Microsoft Corporation and Henry Lucco.
+# Licensed under the MIT License.
+
+# Fixtures for the function tests: a local stand-in for data.commoncrawl.org
+# that serves generated WARC files with HTTP Range support.
+
+import io
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+pytest.importorskip("azure.functions")
+pytest.importorskip("extruct")
+pytest.importorskip("warcio")
+
+from warcio.statusandheaders import StatusAndHeaders  # noqa: E402
+from warcio.warcwriter import WARCWriter  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import process_url_batch  # noqa: E402
+
+RESTAURANT_HTML = (
+    '<html><head><script type="application/ld+json">'
+    '{"@context": "https://schema.org", "@type": "Restaurant", "name": "%s"}'
+    "</script></head><body>%s</body></html>"
+)
+
+
+def restaurant_page(name, filler=2000):
+    return (RESTAURANT_HTML % (name, "x" * filler)).encode()
+
+
+class WarcBuilder:
+    """Writes gzip WARC response records and the index records that point at them"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.buffer = io.BytesIO()
+        self.writer = WARCWriter(self.buffer, gzip=True)
+
+    def add_response(self, url, body, status="200 OK", headers=None):
+        headers = headers or [("Content-Type", "text/html; charset=utf-8")]
+        http_headers = StatusAndHeaders(status, headers, protocol="HTTP/1.1")
+        start = self.buffer.tell()
+        self.writer.write_record(
+            self.writer.create_warc_record(
+                url, "response", payload=io.BytesIO(body), http_headers=http_headers
+            )
+        )
+        return {
+            "url": url,
+            "filename": self.filename,
+            "offset": str(start),
+            "length": str(self.buffer.tell() - start),
+            "status": status.split()[0],
+            "mime": "text/html",
+        }
+
+    def getvalue(self):
+        return self.buffer.getvalue()
+
+
+class WarcServer:
+    """
+    Serves WARC files by path, answering Range requests with 206. Each request
+    waits latency seconds (or latencies[path]) so concurrent fetches overlap;
+    the peak number of requests in flight and the ranges asked for are recorded.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.index_records = {}
+        self.latency = 0.0
+        self.latencies = {}
+        self.requests = 0
+        self.active = 0
+        self.peak = 0
+        self.ranges = []
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self.make_handler())
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def add_warc(self, builder):
+        self.files["/" + builder.filename] = builder.getvalue()
+
+    def make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests += 1
+                    server.active += 1
+                    server.peak = max(server.peak, server.active)
+                try:
+                    path = self.path.split("?")[0]
+                    time.sleep(server.latencies.get(path, server.latency))
+                    server.respond(self, path)
+                finally:
+                    with server.lock:
+                        server.active -= 1
+
+        return Handler
+
+    def respond(self, handler, path):
+        if path.endswith("-index"):
+            url = parse_qs(urlparse(handler.path).query)["url"][0]
+            record = self.index_records.get(url)
+            body = (json.dumps(record) if record else "").encode()
+            handler.send_response(200)
+            handler.send_header("Content-Length", str(len(body)))
+            handler.end_headers()
+            handler.wfile.write(body)
+            return
+
+        data = self.files.get(path)
+        if data is None:
+            handler.send_response(404)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+        start, end = handler.headers["Range"].split("=")[1].split("-")
+        start, end = int(start), min(int(end), len(data) - 1)
+        with self.lock:
+            self.ranges.append((path, start, end))
+        body = data[start : end + 1]
+        handler.send_response(206)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def warc_server(monkeypatch):
+    """
+    A WarcServer that process_url_batch fetches WARC ranges and index lookups
+    from. Pages are parsed in the activity's own thread unless a test sets
+    extract_workers.
+    """
+    server = WarcServer()
+    server.start()
+    monkeypatch.setattr(process_url_batch, "COMMONCRAWL_DATA_URL", server.url)
+    monkeypatch.setattr(process_url_batch, "COMMONCRAWL_INDEX_URL", server.url)
+    monkeypatch.setattr(process_url_batch, "extract_workers", 0)
+    monkeypatch.setattr(process_url_batch, "host_semaphores", {})
+    yield server
+    server.stop()
@@ -0,0 +1,37 @@
+# Copyright (c) Microsoft Corporation and Henry Lucco.
+# Licensed under the MIT License.
+
+import get_urls
+
+
+def capture(path, digest):
+    return {
+        "url": f"https://www.example.com/{path}",
+        "status": "200",
+        "mime": "text/html",
+        "digest": digest,
+        "timestamp": "20250301000000",
+    }
+
+
+def test_iter_urls_counts_captures_after_cross_page_dedupe(monkeypatch):
+    pages = [
+        [capture("a", "D1"), capture("b", "D2")],
+        # The same page again and a copy of page a's content
+        [capture("b", "D2"), capture("c", "D1")],
+        [capture("d", "D4"), capture("e", "D5")],
+    ]
+
+    def get_urls_page(limit, crawl_id, url_prefix, page):
+        return get_urls.dedupe_captures(pages[page])[:limit]
+
+    monkeypatch.setattr(get_urls, "get_num_pages", lambda *args: len(pages))
+    monkeypatch.setattr(get_urls, "get_urls_page", get_urls_page)
+
+    records = list(get_urls.iter_urls(3, "2025-13", "https://www.example.com/"))
+
+    assert [record["url"] for record in records] == [
+        "https://www.example.com/a",
+        "https://www.example.com/b",
+        "https://www.example.com/d",
+    ]
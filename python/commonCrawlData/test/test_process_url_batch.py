@@ -0,0 +1,234 @@
+# Copyright (c) Microsoft Corporation and Henry Lucco.
+# Licensed under the MIT License.
+
+# Tests for process_url_batch against the local WARC stand-in in conftest.py.
+# Run from python/commonCrawlData:
+#
+#   python3 -m pytest test
+
+import io
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import extruct
+import pytest
+from warcio.archiveiterator import ArchiveIterator
+
+import process_url_batch
+from conftest import WarcBuilder, restaurant_page
+
+LATENCY = 0.1
+
+
+def build_records(warc_server, count, filename="crawl/segment/warc/a.warc.gz"):
+    builder = WarcBuilder(filename)
+    records = [
+        builder.add_response(f"https://www.example.com/r/{i}", restaurant_page(f"R{i}"))
+        for i in range(count)
+    ]
+    warc_server.add_warc(builder)
+    return records
+
+
+@pytest.fixture
+def one_record_per_request(monkeypatch):
+    # No coalescing, so every record is its own ranged GET
+    monkeypatch.setattr(process_url_batch, "warc_range_max_gap", -1)
+
+
+def test_fetches_records_concurrently(warc_server, one_record_per_request, monkeypatch):
+    monkeypatch.setattr(process_url_batch, "max_concurrent_fetches", 8)
+    monkeypatch.setattr(process_url_batch, "max_fetches_per_host", 8)
+    warc_server.latency = LATENCY
+    records = build_records(warc_server, 16)
+
+    started = time.perf_counter()
+    results = process_url_batch.process_urls(records)
+    elapsed = time.perf_counter() - started
+
+    assert len(results) == 16
+    assert warc_server.requests == 16
+    assert 1 < warc_server.peak <= 8
+    # Serially the stand-in alone would take 16 * LATENCY
+    assert elapsed < 16 * LATENCY / 2
+
+
+def test_results_keep_batch_order(warc_server, one_record_per_request, monkeypatch):
+    monkeypatch.setattr(process_url_batch, "max_concurrent_fetches", 8)
+    slow = build_records(warc_server, 4, "crawl/segment/warc/slow.warc.gz")
+    fast = build_records(warc_server, 4, "crawl/segment/warc/fast.warc.gz")
+    # The slow file's records finish last but come first in the batch
+    warc_server.latencies["/crawl/segment/warc/slow.warc.gz"] = 3 * LATENCY
+    batch = [slow[3], fast[0], slow[1], fast[2], slow[0], fast[3], slow[2], fast[1]]
+
+    results = process_url_batch.process_urls(batch)
+
+    assert [r["_source_url"] for r in results] == [r["url"] for r in batch]
+
+
+def test_limits_fetches_per_host(warc_server, one_record_per_request, monkeypatch):
+    monkeypatch.setattr(process_url_batch, "max_concurrent_fetches", 8)
+    monkeypatch.setattr(process_url_batch, "max_fetches_per_host", 3)
+    warc_server.latency = LATENCY
+    records = build_records(warc_server, 12)
+
+    results = process_url_batch.process_urls(records)
+
+    assert len(results) == 12
+    assert warc_server.peak == 3
+
+
+def test_follows_redirect_after_closing_range(warc_server, monkeypatch):
+    # The stand-in serves data and index from one host: a redirect followed
+    # while the range still held the only slot would never get another one
+    monkeypatch.setattr(process_url_batch, "max_fetches_per_host", 1)
+    monkeypatch.setattr(process_url_batch.random, "uniform", lambda a, b: 0)
+    builder = WarcBuilder("crawl/segment/warc/a.warc.gz")
+    moved = builder.add_response(
+        "https://www.example.com/old",
+        b"",
+        status="301 Moved Permanently",
+        headers=[("Content-Type", "text/html"), ("Location", "/new")],
+    )
+    target = builder.add_response("https://www.example.com/new", restaurant_page("New"))
+    warc_server.add_warc(builder)
+    warc_server.index_records[target["url"]] = target
+
+    results = []
+    worker = threading.Thread(
+        target=lambda: results.extend(process_url_batch.process_urls([moved])),
+        daemon=True,
+    )
+    worker.start()
+    worker.join(timeout=10)
+
+    assert not worker.is_alive()
+    assert [r["name"] for r in results] == ["New"]
+    assert [r["_source_url"] for r in results] == [moved["url"]]
+
+
+def test_caps_decoded_page_size(monkeypatch):
+    monkeypatch.setattr(process_url_batch, "max_html_bytes", 1000)
+    builder = WarcBuilder("crawl/segment/warc/a.warc.gz")
+    builder.add_response("https://www.example.com/big", restaurant_page("Big", 100000))
+
+    record = next(ArchiveIterator(io.BytesIO(builder.getvalue())))
+    html, location = process_url_batch.extract_html_from_record(record)
+
+    assert location is None
+    assert len(html) == 1000
+
+
+def test_coalesces_nearby_records_into_one_request(warc_server):
+    records = build_records(warc_server, 10)
+    # Every other record, so the range also spans records nobody asked for
+    batch = records[::2]
+
+    results = process_url_batch.process_urls(batch)
+
+    assert [r["_source_url"] for r in results] == [r["url"] for r in batch]
+    assert warc_server.requests == 1
+    _, start, end = warc_server.ranges[0]
+    assert start == int(batch[0]["offset"])
+    assert end == int(batch[-1]["offset"]) + int(batch[-1]["length"]) - 1
+
+
+JSONLD_SCRIPT = (
+    '<script type="application/ld+json">'
+    '{"@type": "Restaurant", "name": "%s"}</script>'
+)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        JSONLD_SCRIPT % "Plain",
+        '<SCRIPT TYPE=application/ld+json>{"@type": "Restaurant", "name": "Upper"}'
+        "</SCRIPT>",
+        "<!-- %s -->" % (JSONLD_SCRIPT % "Comment"),
+        "<textarea>%s</textarea>" % (JSONLD_SCRIPT % "Textarea"),
+        "<title>%s</title>" % (JSONLD_SCRIPT % "Title"),
+        "<script>var s = '%s';</script>" % (JSONLD_SCRIPT % "String"),
+        "<noscript>%s</noscript>" % (JSONLD_SCRIPT % "Noscript"),
+        "<!-- x -->%s<textarea>%s</textarea>"
+        % (JSONLD_SCRIPT % "A", JSONLD_SCRIPT % "B"),
+    ],
+)
+def test_jsonld_scripts_match_extruct(body):
+    html = f"<html><head></head><body>{body}</body></html>"
+
+    items = process_url_batch.parse_jsonld_scripts(html)
+
+    assert items == extruct.extract(html, syntaxes=["json-ld"])["json-ld"]
+
+
+def test_jsonld_scripts_in_templates_are_left_to_extruct():
+    html = f"<html><body><template>{JSONLD_SCRIPT % 'T'}</template></body></html>"
+    assert process_url_batch.parse_jsonld_scripts(html) is None
+
+
+def test_microdata_marker_is_case_insensitive():
+    html = (
+        '<html><body><div ItemScope ItemType="https://schema.org/Restaurant">'
+        '<span ItemProp="name">Mixed</span></div></body></html>'
+    )
+
+    data = process_url_batch.extract_schema_data(html, "https://www.example.com/")
+
+    assert data["type"] == "https://schema.org/Restaurant"
+    assert data["properties"]["name"] == "Mixed"
+
+
+def test_failed_extract_stage_stops_fetch_stage(
+    warc_server, one_record_per_request, monkeypatch
+):
+    monkeypatch.setattr(process_url_batch, "extract_queue_size", 1)
+    records = build_records(warc_server, 40)
+
+    def failing_extract_stage(html_queue, metrics):
+        html_queue.get()
+        raise RuntimeError("extract stage failed")
+
+    monkeypatch.setattr(process_url_batch, "run_extract_stage", failing_extract_stage)
+
+    with pytest.raises(RuntimeError, match="extract stage failed"):
+        process_url_batch.process_urls(records)
+
+    assert not any(t.name == "warc-fetch-stage" for t in threading.enumerate())
+    assert warc_server.requests < len(records)
+
+
+@pytest.fixture
+def extract_pool(monkeypatch):
+    monkeypatch.setattr(process_url_batch, "extract_workers", 1)
+    monkeypatch.setattr(process_url_batch, "extract_pool", None)
+    yield
+    if process_url_batch.extract_pool is not None:
+        process_url_batch.extract_pool.shutdown()
+
+
+def test_broken_extract_pool_is_replaced(warc_server, extract_pool):
+    records = build_records(warc_server, 4)
+    pool = process_url_batch.get_extract_pool()
+    # A worker that dies breaks the whole pool
+    with pytest.raises(BrokenProcessPool):
+        pool.submit(os._exit, 1).result(timeout=60)
+
+    results = process_url_batch.process_urls(records)
+
+    assert [r["name"] for r in results] == ["R0", "R1", "R2", "R3"]
+    assert process_url_batch.extract_pool not in (None, pool)
+
+
+def test_extract_metrics_count_busy_seconds(warc_server):
+    records = build_records(warc_server, 3)
+    metrics = {}
+
+    process_url_batch.process_urls(records, metrics)
+
+    extract = metrics["extract"]
+    assert extract["pages"] == 3
+    assert 0 < extract["busy_seconds"] <= extract["seconds"]
+    assert "utilization" in extract
@@ -0,0 +1,95 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# Microbenchmark for image title/caption lookup on a synthetic, image-dense page.
+# Compares the per-page ImageBBoxIndex against the original linear scan and
+# checks that both return the same image chunks for every line.
+#
+#   python3 bench_caption_lookup.py [-images 400] [-lines 4000] [-repeat 3]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "srag"))
+
+from pdfChunkerV2 import PDFChunker, Chunk, Blob, ImageBBoxIndex  # type: ignore
+
+PAGE_WIDTH = 612.0
+PAGE_HEIGHT = 792.0
+
+def make_image_chunks(count: int, rng: random.Random) -> dict[str, Chunk]:
+    """A catalog-style page: a grid of small images with some random jitter."""
+    chunks: dict[str, Chunk] = {}
+    for i in range(count):
+        w = rng.uniform(20, 80)
+        h = rng.uniform(20, 80)
+        x0 = rng.uniform(0, PAGE_WIDTH - w)
+        y0 = rng.uniform(0, PAGE_HEIGHT - h)
+        name = f"image_0_{i}"
+        blob = Blob(blob_type="image", start=0, bbox=[x0, y0, x0 + w, y0 + h], img_name=name)
+        chunks[name] = Chunk(id=f"img-{i}", pageid="0", blobs=[blob])
+    return chunks
+
+def make_line_bboxes(count: int, rng: random.Random) -> list[list[float]]:
+    lines = []
+    for _ in range(count):
+        x0 = rng.uniform(0, PAGE_WIDTH - 100)
+        y0 = rng.uniform(0, PAGE_HEIGHT - 10)
+        lines.append([x0, y0, x0 + rng.uniform(20, 200), y0 + rng.uniform(6, 12)])
+    return lines
+
+def get_int_arg(args: list[str], name: str, default: int) -> int:
+    if name in args and args.index(name) + 1 < len(args):
+        return int(args[args.index(name) + 1])
+    return default
+
+def main() -> int:
+    args = sys.argv[1:]
+    image_count = get_int_arg(args, "-images", 400)
+    line_count = get_int_arg(args, "-lines", 4000)
+    repeat = get_int_arg(args, "-repeat", 3)
+
+    rng = random.Random(1234)
+    image_chunks = make_image_chunks(image_count, rng)
+    line_bboxes = make_line_bboxes(line_count, rng)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        chunker = PDFChunker(os.path.join(tmp_dir, "synthetic.pdf"), tmp_dir)
+        chunker.doc_image_chunksmap = {0: image_chunks}
+
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            chunker.doc_image_index = {0: ImageBBoxIndex(image_chunks.values())}
+        build_time = (time.perf_counter() - t0) / repeat
+
+        def run(lookup) -> tuple[float, list[list[str]]]:
+            best = float("inf")
+            matches: list[list[str]] = []
+            for _ in range(repeat):
+                t = time.perf_counter()
+                matches = []
+                for bbox in line_bboxes:
+                    found = lookup(0, bbox)
+                    matches.append([c.id for c in found[1]] if found else [])
+                best = min(best, time.perf_counter() - t)
+            return best, matches
+
+        scan_time, scan_matches = run(chunker._find_nearest_image_chunk_orig)
+        index_time, index_matches = run(chunker._find_nearest_image_chunk)
+
+    if scan_matches != index_matches:
+        print("MISMATCH: indexed lookup differs from linear scan")
+        return 1
+
+    matched = sum(1 for m in index_matches if m)
+    print(f"images={image_count} lines={line_count} lines_with_matches={matched}")
+    print(f"linear scan : {scan_time * 1000:9.2f} ms")
+    print(f"index build : {build_time * 1000:9.2f} ms")
+    print(f"index lookup: {index_time * 1000:9.2f} ms  ({scan_time / max(index_time, 1e-9):.1f}x)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
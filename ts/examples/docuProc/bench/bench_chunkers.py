@@ -0,0 +1,224 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# End-to-end benchmark for the chunker's v1 (pdfChunker.py) and v2
+# (srag/pdfChunkerV2.py) strategies.
+# Each (chunker, file) run happens in a fresh interpreter, so peak RSS is per
+# run. Reports wall time split by stage, peak RSS and chunk counts, and can
+# save a baseline or check a run against one:
+#
+#   python3 bench_chunkers.py [-corpus DIR] [-kinds ...] [-pages 1 10 100] [-large]
+#                             [-files a.pdf ...] [-chunkers v1 v2] [-repeat N]
+#                             [-out results.json] [-save baseline.json]
+#                             [-check baseline.json] [-tolerance 0.25]
+#
+# -check exits with 1 when a chunk count differs from the baseline, or when
+# time or peak RSS grows by more than the tolerance. Baselines are only
+# comparable on the same machine.
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, "..", "src")
+CHUNKER_DIRS = {"v1": SRC_DIR, "v2": os.path.join(SRC_DIR, "srag")}
+CHUNKER_MODULES = {"v1": "pdfChunker", "v2": "pdfChunkerV2"}
+
+# Chunker methods timed as a stage; a stage's time excludes the stages it calls
+METHOD_STAGES = {
+    "get_lines_from_dict": "lines",
+    "extract_line_entries": "lines",
+    "assemble_merged_lines": "lines",
+    "get_imagechunkmap_for_doc": "images",
+    "load_page_images": "images",
+    "extract_page_tables": "tables",
+    "split_paragraphs": "paragraphs",
+    "merge_single_line_headings": "paragraphs",
+    "chunk_paragraph_by_sentence": "paragraphs",
+    "chunk_paragraphs_by_sentence": "paragraphs",
+}
+STAGE_ORDER = ["open", "lines", "images", "pixmaps", "tables", "paragraphs", "serialize", "other"]
+TIME_SLACK_SECONDS = 0.05
+RSS_SLACK_MB = 5.0
+
+class StageTimer:
+    """Exclusive wall time and call counts per stage, for nested instrumented calls."""
+    def __init__(self):
+        self.seconds: dict[str, float] = {}
+        self.calls: dict[str, int] = {}
+        self.stack: list[list[Any]] = []  # [stage, start, time spent in nested stages]
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            self.stack.append([stage, time.perf_counter(), 0.0])
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _, start, nested = self.stack.pop()
+                elapsed = time.perf_counter() - start
+                self.seconds[stage] = self.seconds.get(stage, 0.0) + elapsed - nested
+                self.calls[stage] = self.calls.get(stage, 0) + 1
+                if self.stack:
+                    self.stack[-1][2] += elapsed
+        return timed
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+def run_one(chunker_name: str, file_path: str, output_dir: str) -> dict[str, Any]:
+    """Chunk one file in this process with stage instrumentation."""
+    sys.path.insert(0, CHUNKER_DIRS[chunker_name])
+    import pymupdf as fitz  # type: ignore
+    module = __import__(CHUNKER_MODULES[chunker_name])
+
+    timer = StageTimer()
+    for method, stage in METHOD_STAGES.items():
+        if hasattr(module.PDFChunker, method):
+            setattr(module.PDFChunker, method, timer.wrap(stage, getattr(module.PDFChunker, method)))
+    module.fitz.open = timer.wrap("open", fitz.open)
+    fitz.Pixmap.save = timer.wrap("pixmaps", fitz.Pixmap.save)
+    module.ChunkedFileWriter.write = timer.wrap("serialize", module.ChunkedFileWriter.write)
+
+    options = module.ChunkerOptions.for_strategy(chunker_name)
+    if hasattr(options, "chunk_cache"):
+        options.chunk_cache = False  # measure the work, not the cache
+
+    t0 = time.perf_counter()
+    result = module.chunk_file(file_path, output_dir, options)
+    total = time.perf_counter() - t0
+
+    stages = dict(timer.seconds)
+    stages["other"] = max(0.0, total - sum(stages.values()))
+    return {
+        "seconds": total,
+        "stages": stages,
+        "calls": timer.calls,
+        "peakRssMb": peak_rss_mb(),
+        "chunks": len(result.chunks) if hasattr(result, "chunks") else None,
+        "error": getattr(result, "error", None),
+    }
+
+def run_in_subprocess(chunker_name: str, file_path: str, repeat: int) -> dict[str, Any]:
+    """Best (fastest) of `repeat` runs, each in a fresh interpreter."""
+    best: Optional[dict[str, Any]] = None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as output_dir:
+            proc = subprocess.run(
+                [sys.executable, "-X", "utf8", __file__, "-one", chunker_name, file_path, output_dir],
+                capture_output=True,
+                text=True,
+            )
+        if proc.returncode != 0:
+            return {"error": proc.stderr.strip() or f"exit code {proc.returncode}"}
+        run = json.loads(proc.stdout.strip().splitlines()[-1])
+        if best is None or run["seconds"] < best["seconds"]:
+            best = run
+    assert best is not None
+    return best
+
+def print_report(runs: dict[str, dict[str, Any]], chunkers: list[str], files: list[str]) -> None:
+    header = f"{'run':<28} {'total s':>8} " + " ".join(f"{s:>10}" for s in STAGE_ORDER) + f" {'RSS MB':>8} {'chunks':>7}"
+    print(header)
+    for file_path in files:
+        name = os.path.basename(file_path)
+        for chunker_name in chunkers:
+            run = runs[f"{chunker_name}/{name}"]
+            label = f"{chunker_name}/{name}"
+            if run.get("error"):
+                print(f"{label:<28} ERROR: {run['error'].splitlines()[-1]}")
+                continue
+            stages = " ".join(f"{run['stages'].get(s, 0.0):>10.3f}" for s in STAGE_ORDER)
+            rss = f"{run['peakRssMb']:.1f}" if run["peakRssMb"] is not None else "-"
+            print(f"{label:<28} {run['seconds']:>8.3f} {stages} {rss:>8} {run['chunks']:>7}")
+        counts = {c: runs[f"{c}/{name}"].get("chunks") for c in chunkers}
+        if len(chunkers) == 2 and None not in counts.values():
+            diff = counts[chunkers[1]] - counts[chunkers[0]]
+            print(f"{'':<28} chunk count {chunkers[1]}-{chunkers[0]}: {diff:+d}")
+
+def check_against_baseline(runs: dict[str, dict[str, Any]], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    problems = []
+    for key, base in baseline["runs"].items():
+        run = runs.get(key)
+        if run is None or base.get("error"):
+            continue
+        if run.get("error"):
+            problems.append(f"{key}: failed: {run['error'].splitlines()[-1]}")
+            continue
+        if run["chunks"] != base["chunks"]:
+            problems.append(f"{key}: chunk count {run['chunks']} != baseline {base['chunks']}")
+        time_limit = base["seconds"] * (1 + tolerance) + TIME_SLACK_SECONDS
+        if run["seconds"] > time_limit:
+            problems.append(f"{key}: {run['seconds']:.3f}s > baseline {base['seconds']:.3f}s (+{tolerance:.0%})")
+        if run["peakRssMb"] is not None and base.get("peakRssMb") is not None:
+            rss_limit = base["peakRssMb"] * (1 + tolerance) + RSS_SLACK_MB
+            if run["peakRssMb"] > rss_limit:
+                problems.append(f"{key}: peak RSS {run['peakRssMb']:.1f} MB > baseline {base['peakRssMb']:.1f} MB (+{tolerance:.0%})")
+    return problems
+
+def get_list_arg(args: list[str], name: str, default: list[str]) -> list[str]:
+    if name not in args:
+        return default
+    values = []
+    i = args.index(name) + 1
+    while i < len(args) and not args[i].startswith("-"):
+        values.append(args[i])
+        i += 1
+    return values
+
+def main() -> int:
+    args = sys.argv[1:]
+    if args and args[0] == "-one":
+        print(json.dumps(run_one(args[1], args[2], args[3])))
+        return 0
+
+    files = [os.path.abspath(f) for f in get_list_arg(args, "-files", [])]
+    if not files:
+        from make_corpus import DEFAULT_PAGES, KINDS, make_corpus
+        corpus_dir = get_list_arg(args, "-corpus", [os.path.join(BENCH_DIR, "corpus")])[0]
+        page_counts = [int(p) for p in get_list_arg(args, "-pages", [str(p) for p in DEFAULT_PAGES])]
+        if "-large" in args:
+            page_counts.append(2000)
+        entries = make_corpus(corpus_dir, get_list_arg(args, "-kinds", list(KINDS)), page_counts)
+        files = [os.path.join(corpus_dir, entry["name"]) for entry in entries]
+
+    chunkers = get_list_arg(args, "-chunkers", ["v1", "v2"])
+    repeat = int(get_list_arg(args, "-repeat", ["1"])[0])
+    tolerance = float(get_list_arg(args, "-tolerance", ["0.25"])[0])
+
+    runs: dict[str, dict[str, Any]] = {}
+    for file_path in files:
+        for chunker_name in chunkers:
+            runs[f"{chunker_name}/{os.path.basename(file_path)}"] = run_in_subprocess(chunker_name, file_path, repeat)
+    print_report(runs, chunkers, files)
+
+    results = {"python": platform.python_version(), "machine": platform.platform(), "runs": runs}
+    for name in ("-out", "-save"):
+        if name in args:
+            with open(get_list_arg(args, name, [])[0], "w") as f:
+                json.dump(results, f, indent=2)
+
+    if "-check" in args:
+        with open(get_list_arg(args, "-check", [])[0], "r") as f:
+            baseline = json.load(f)
+        problems = check_against_baseline(runs, baseline, tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        if problems:
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
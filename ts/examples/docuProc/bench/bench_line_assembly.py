@@ -0,0 +1,123 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# Regression check and scaling benchmark for PDFChunker.assemble_merged_lines.
+# Runs the linear assembler and the original quadratic loop on the same line
+# entries and fails if their merged lines differ.
+#
+#   python3 bench_line_assembly.py [-sizes 1000 5000 10000 20000]   synthetic pages
+#   python3 bench_line_assembly.py -files a.pdf b.pdf                 real PDFs (needs PyMuPDF)
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "srag"))
+
+from pdfChunkerV2 import PDFChunker, Chunk, Blob  # type: ignore
+
+def make_line_entries(count: int, rng: random.Random) -> list[dict]:
+    """
+    Dense small text: rows split into 1-3 fragments, occasional bold or larger
+    headings, paragraph gaps and image-caption lines.
+    """
+    image_chunk = Chunk(id="img-0", pageid="0", blobs=[Blob(blob_type="image", start=0)])
+    entries: list[dict] = []
+    y = 0.0
+    line_index = 0
+    while len(entries) < count:
+        y += rng.choice([6.0, 6.0, 6.0, 6.0, 16.0])
+        heading = rng.random() < 0.03
+        font_size = rng.choice([5.5, 6.0]) + (4.0 if heading else 0.0)
+        is_bold = heading or rng.random() < 0.02
+        label = "image" if rng.random() < 0.02 else "text"
+        x = 36.0
+        for _ in range(rng.choice([1, 1, 2, 3])):
+            width = rng.uniform(30, 150)
+            entries.append({
+                "text": f"word{len(entries)} text.",
+                "label": label,
+                "line_index": line_index,
+                "x0": x,
+                "y0": y,
+                "x1": x + width,
+                "y1": y + font_size,
+                "related_chunks": [image_chunk] if label == "image" else [],
+                "font_size": font_size,
+                "is_bold": is_bold,
+            })
+            x += width + rng.uniform(2, 20)
+            line_index += 1
+    return entries[:count]
+
+def to_comparable(merged_lines: list) -> list[tuple[str, str, list[str]]]:
+    return [(text, label, [c.id for c in chunks]) for text, label, chunks in merged_lines]
+
+def time_assembly(assemble, entries: list[dict]) -> tuple[float, list]:
+    # Assembly updates labels in place, so every run gets fresh entry dicts
+    fresh = [dict(e) for e in entries]
+    t0 = time.perf_counter()
+    result = assemble(fresh)
+    return time.perf_counter() - t0, to_comparable(result)
+
+def run_synthetic(chunker: PDFChunker, sizes: list[int]) -> bool:
+    ok = True
+    rng = random.Random(42)
+    print(f"{'lines':>8} {'original ms':>12} {'linear ms':>10} {'speedup':>8}")
+    for size in sizes:
+        entries = make_line_entries(size, rng)
+        orig_time, orig_lines = time_assembly(chunker.assemble_merged_lines_orig, entries)
+        new_time, new_lines = time_assembly(chunker.assemble_merged_lines, entries)
+        same = orig_lines == new_lines
+        ok = ok and same
+        print(f"{size:>8} {orig_time * 1000:>12.2f} {new_time * 1000:>10.2f} {orig_time / max(new_time, 1e-9):>7.1f}x"
+              + ("" if same else "  MISMATCH"))
+    return ok
+
+def run_files(files: list[str], output_dir: str) -> bool:
+    ok = True
+    for file_path in files:
+        chunker = PDFChunker(file_path, output_dir)
+        session = chunker.get_session()
+        chunker.doc_image_chunksmap = chunker.get_imagechunkmap_for_doc()
+        total_orig = total_new = 0.0
+        for page in session.doc:
+            entries = chunker.extract_line_entries(page)
+            orig_time, orig_lines = time_assembly(chunker.assemble_merged_lines_orig, entries)
+            new_time, new_lines = time_assembly(chunker.assemble_merged_lines, entries)
+            total_orig += orig_time
+            total_new += new_time
+            if orig_lines != new_lines:
+                ok = False
+                print(f"MISMATCH: {file_path} page {page.number}")
+        chunker.close_session()
+        print(f"{os.path.basename(file_path)}: original {total_orig * 1000:.2f} ms, linear {total_new * 1000:.2f} ms")
+    return ok
+
+def main() -> int:
+    args = sys.argv[1:]
+    files: list[str] = []
+    sizes = [1000, 5000, 10000, 20000]
+    if "-files" in args:
+        i = args.index("-files") + 1
+        while i < len(args) and not args[i].startswith("-"):
+            files.append(os.path.abspath(args[i]))
+            i += 1
+    if "-sizes" in args:
+        sizes = []
+        i = args.index("-sizes") + 1
+        while i < len(args) and not args[i].startswith("-"):
+            sizes.append(int(args[i]))
+            i += 1
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if files:
+            ok = run_files(files, tmp_dir)
+        else:
+            ok = run_synthetic(PDFChunker(os.path.join(tmp_dir, "synthetic.pdf"), tmp_dir), sizes)
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# Synthetic PDF corpus for the chunker benchmarks, generated locally with PyMuPDF.
+# The same seed always produces the same documents, so chunk counts can be
+# compared against a stored baseline.
+#
+#   python3 make_corpus.py [-outdir corpus] [-kinds text images tables columns] [-pages 1 10 100] [-seed 7]
+#
+# Writes KIND-PAGESp.pdf files and a manifest.json listing them.
+
+import json
+import os
+import random
+import sys
+
+import pymupdf as fitz  # type: ignore
+
+KINDS = ("text", "images", "tables", "columns")
+DEFAULT_PAGES = [1, 10, 100]
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+MARGIN = 54
+SPILL_HEIGHT = 70  # room kept above the page number for a text page's last paragraph
+
+WORDS = (
+    "chunk page layout table image caption figure paragraph section model data "
+    "result method sample value column row index query latency memory process "
+    "document parser token header stream cache render vector score metric"
+).split()
+
+def sentence(rng: random.Random, min_words: int = 6, max_words: int = 18) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+def paragraph(rng: random.Random, sentences: int) -> str:
+    return " ".join(sentence(rng) for _ in range(sentences))
+
+def add_page_number(page: fitz.Page, page_num: int) -> None:
+    page.insert_text((PAGE_WIDTH / 2, PAGE_HEIGHT - 30), str(page_num + 1), fontsize=9)
+
+def add_heading(page: fitz.Page, y: float, text: str) -> float:
+    page.insert_text((MARGIN, y), text, fontsize=14, fontname="hebo")
+    return y + 24
+
+def add_text_block(page: fitz.Page, rect: fitz.Rect, text: str, fontsize: float = 10) -> None:
+    page.insert_textbox(rect, text, fontsize=fontsize, fontname="helv")
+
+def make_text_page(page: fitz.Page, page_num: int, rng: random.Random) -> None:
+    y = add_heading(page, MARGIN + 14, f"Section {page_num + 1}. {sentence(rng, 2, 4)[:-1]}")
+    while True:
+        height = rng.choice([70, 90, 110])
+        # Stop while there is still room for the spill-over paragraph
+        if y + height + 14 > PAGE_HEIGHT - 60 - SPILL_HEIGHT:
+            break
+        add_text_block(page, fitz.Rect(MARGIN, y, PAGE_WIDTH - MARGIN, y + height), paragraph(rng, rng.randint(3, 6)))
+        y += height + 14
+    # Spill-over paragraph without final punctuation, continued on the next page
+    add_text_block(page, fitz.Rect(MARGIN, y, PAGE_WIDTH - MARGIN, PAGE_HEIGHT - 60), paragraph(rng, 3)[:-1] + " and")
+    add_page_number(page, page_num)
+
+def make_image(rng: random.Random, width: int, height: int) -> fitz.Pixmap:
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, width, height), False)
+    pix.clear_with(rng.randint(40, 220))
+    return pix
+
+def make_images_page(page: fitz.Page, page_num: int, rng: random.Random, logo: bytes) -> None:
+    y = add_heading(page, MARGIN + 14, f"Figures {page_num + 1}")
+    # A repeated logo, as in headers of real reports, plus distinct figures
+    page.insert_image(fitz.Rect(PAGE_WIDTH - MARGIN - 40, 20, PAGE_WIDTH - MARGIN, 44), stream=logo)
+    for figure in range(rng.randint(2, 4)):
+        if y > PAGE_HEIGHT - 220:
+            break
+        height = rng.choice([100, 130, 160])
+        page.insert_image(fitz.Rect(MARGIN, y, MARGIN + 260, y + height), pixmap=make_image(rng, 64, 48))
+        page.insert_text((MARGIN, y + height + 14), f"Figure {page_num + 1}.{figure + 1}: {sentence(rng, 4, 8)}", fontsize=9)
+        add_text_block(page, fitz.Rect(MARGIN + 280, y, PAGE_WIDTH - MARGIN, y + height), paragraph(rng, 3), fontsize=9)
+        y += height + 40
+    add_page_number(page, page_num)
+
+def make_tables_page(page: fitz.Page, page_num: int, rng: random.Random) -> None:
+    y = add_heading(page, MARGIN + 14, f"Table {page_num + 1}")
+    add_text_block(page, fitz.Rect(MARGIN, y, PAGE_WIDTH - MARGIN, y + 60), paragraph(rng, 2))
+    y += 70
+    columns = rng.randint(3, 6)
+    rows = rng.randint(8, 20)
+    cell_width = (PAGE_WIDTH - 2 * MARGIN) / columns
+    cell_height = 18
+    for row in range(rows + 1):
+        page.draw_line((MARGIN, y + row * cell_height), (PAGE_WIDTH - MARGIN, y + row * cell_height), width=0.5)
+    for column in range(columns + 1):
+        x = MARGIN + column * cell_width
+        page.draw_line((x, y), (x, y + rows * cell_height), width=0.5)
+    for row in range(rows):
+        for column in range(columns):
+            text = rng.choice(WORDS) if row == 0 else f"{rng.uniform(0, 1000):.2f}"
+            page.insert_text((MARGIN + column * cell_width + 4, y + row * cell_height + 13), text, fontsize=9)
+    y += rows * cell_height + 20
+    add_text_block(page, fitz.Rect(MARGIN, y, PAGE_WIDTH - MARGIN, PAGE_HEIGHT - 60), paragraph(rng, 3))
+    add_page_number(page, page_num)
+
+def make_columns_page(page: fitz.Page, page_num: int, rng: random.Random) -> None:
+    y = add_heading(page, MARGIN + 14, f"Article {page_num + 1}")
+    gutter = 18
+    column_width = (PAGE_WIDTH - 2 * MARGIN - gutter) / 2
+    for column in range(2):
+        x0 = MARGIN + column * (column_width + gutter)
+        add_text_block(page, fitz.Rect(x0, y, x0 + column_width, PAGE_HEIGHT - 60), paragraph(rng, 14), fontsize=9)
+    add_page_number(page, page_num)
+
+def make_pdf(path: str, kind: str, pages: int, seed: int) -> None:
+    rng = random.Random(f"{seed}-{kind}-{pages}")
+    logo = make_image(random.Random(seed), 32, 16).tobytes("png")
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        if kind == "text":
+            make_text_page(page, page_num, rng)
+        elif kind == "images":
+            make_images_page(page, page_num, rng, logo)
+        elif kind == "tables":
+            make_tables_page(page, page_num, rng)
+        else:
+            make_columns_page(page, page_num, rng)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+def make_corpus(outdir: str, kinds: list[str], page_counts: list[int], seed: int = 7) -> list[dict]:
+    """Generate any missing corpus files and return the manifest entries."""
+    os.makedirs(outdir, exist_ok=True)
+    entries = []
+    for kind in kinds:
+        for pages in page_counts:
+            name = f"{kind}-{pages}p.pdf"
+            path = os.path.join(outdir, name)
+            if not os.path.exists(path):
+                make_pdf(path, kind, pages, seed)
+            entries.append({"name": name, "kind": kind, "pages": pages, "seed": seed})
+    with open(os.path.join(outdir, "manifest.json"), "w") as f:
+        json.dump(entries, f, indent=2)
+    return entries
+
+def get_list_arg(args: list[str], name: str, default: list[str]) -> list[str]:
+    if name not in args:
+        return default
+    values = []
+    i = args.index(name) + 1
+    while i < len(args) and not args[i].startswith("-"):
+        values.append(args[i])
+        i += 1
+    return values
+
+def main() -> int:
+    args = sys.argv[1:]
+    outdir = get_list_arg(args, "-outdir", [os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")])[0]
+    kinds = get_list_arg(args, "-kinds", list(KINDS))
+    page_counts = [int(p) for p in get_list_arg(args, "-pages", [str(p) for p in DEFAULT_PAGES])]
+    seed = int(get_list_arg(args, "-seed", ["7"])[0])
+    unknown = [kind for kind in kinds if kind not in KINDS]
+    if unknown:
+        print(f"Unknown kinds: {unknown}; expected {list(KINDS)}")
+        return 2
+    for entry in make_corpus(outdir, kinds, page_counts, seed):
+        print(f"{entry['name']}: {entry['pages']} pages")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
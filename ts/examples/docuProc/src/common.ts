@@ -5,6 +5,8 @@ import path from "path";
 import { fileURLToPath } from "url";
 import * as fsp from "fs/promises";
 import * as fs from "fs";
+import * as readline from "readline";
+import { ChildProcessWithoutNullStreams, spawn } from "child_process";
 import { lock } from "proper-lockfile";
 
 import {
@@ -61,6 +63,279 @@ export function resolveAndValidateFiles(filenames: string[]): string[] {
     return absFilenames;
 }
 
+export interface NdjsonRunResult<T> {
+    results: T[];
+    stdout: string;
+    stderr: string;
+    exitCode: number | null;
+}
+
+/**
+ * Run a python chunker script with -ndjson and parse its stdout line by line.
+ * Each parsed line is passed to onResult as soon as the chunker finishes that
+ * file, so callers can start indexing before the whole batch is done.
+ */
+export async function runNdjsonChunker<T>(
+    scriptPath: string,
+    args: string[],
+    onResult?: (result: T) => void | Promise<void>,
+): Promise<NdjsonRunResult<T>> {
+    const child = spawn("python3", [
+        "-X",
+        "utf8",
+        scriptPath,
+        ...args,
+        "-ndjson",
+    ]);
+
+    let stderr = "";
+    child.stderr.setEncoding("utf8");
+    child.stderr.on("data", (data: string) => {
+        stderr += data;
+    });
+    const exited = new Promise<number | null>((resolve, reject) => {
+        child.on("error", reject);
+        child.on("close", resolve);
+    });
+
+    const results: T[] = [];
+    const lines: string[] = [];
+    const rl = readline.createInterface({
+        input: child.stdout,
+        crlfDelay: Infinity,
+    });
+    for await (const line of rl) {
+        if (!line.trim()) {
+            continue;
+        }
+        lines.push(line);
+        let result: T;
+        try {
+            result = JSON.parse(line) as T;
+        } catch {
+            // Not a result line, e.g. a library notice printed to stdout
+            continue;
+        }
+        results.push(result);
+        if (onResult) {
+            await onResult(result);
+        }
+    }
+
+    const exitCode = await exited;
+    return { results, stdout: lines.join("\n"), stderr, exitCode };
+}
+
+interface ChunkerRpcMessage {
+    jsonrpc: "2.0";
+    id?: number | null;
+    method?: string;
+    params?: any;
+    result?: any;
+    error?: { code: number; message: string };
+}
+
+// Only the tail of the server's stderr is kept, for error messages
+const MAX_STDERR_CHARS = 64 * 1024;
+
+interface PendingChunkRequest<T> {
+    results: T[];
+    onResult?: ((result: T) => void | Promise<void>) | undefined;
+    // Serializes onResult calls so results are handled in arrival order
+    chain: Promise<void>;
+    resolve: (results: T[]) => void;
+    reject: (error: Error) => void;
+}
+
+/**
+ * Client for a chunker script running in -server mode. The python process is
+ * started on first use and kept alive, so the interpreter and PDF libraries
+ * are loaded once instead of once per import.
+ */
+export class ChunkerServer<T> {
+    private child: ChildProcessWithoutNullStreams | undefined;
+    private nextId = 1;
+    private pending = new Map<number, PendingChunkRequest<T>>();
+    private stderr = "";
+
+    constructor(
+        public readonly scriptPath: string,
+        private readonly serverArgs: string[] = [],
+    ) {}
+
+    public chunk(
+        files: string[],
+        outdir: string,
+        onResult?: (result: T) => void | Promise<void>,
+    ): Promise<T[]> {
+        const child = this.ensureStarted();
+        const id = this.nextId++;
+        return new Promise<T[]>((resolve, reject) => {
+            this.pending.set(id, {
+                results: [],
+                onResult,
+                chain: Promise.resolve(),
+                resolve,
+                reject,
+            });
+            this.setActive(true);
+            child.stdin.write(
+                JSON.stringify({
+                    jsonrpc: "2.0",
+                    id,
+                    method: "chunk",
+                    params: { files, outdir },
+                }) + "\n",
+            );
+        });
+    }
+
+    public close(): void {
+        if (this.child) {
+            this.child.stdin.write(
+                JSON.stringify({ jsonrpc: "2.0", id: 0, method: "shutdown" }) +
+                    "\n",
+            );
+            this.child.stdin.end();
+            this.child = undefined;
+        }
+    }
+
+    private ensureStarted(): ChildProcessWithoutNullStreams {
+        if (this.child) {
+            return this.child;
+        }
+        const child = spawn("python3", [
+            "-X",
+            "utf8",
+            this.scriptPath,
+            "-server",
+            ...this.serverArgs,
+        ]);
+        this.stderr = "";
+        child.stderr.setEncoding("utf8");
+        child.stderr.on("data", (data: string) => this.appendStderr(data));
+        const rl = readline.createInterface({
+            input: child.stdout,
+            crlfDelay: Infinity,
+        });
+        rl.on("line", (line) => this.onLine(line));
+        child.on("error", (error) => this.onExit(child, error));
+        child.on("close", (code) =>
+            this.onExit(
+                child,
+                new Error(
+                    this.stderr || `Chunker server exited with code ${code}`,
+                ),
+            ),
+        );
+        this.child = child;
+        return child;
+    }
+
+    private onLine(line: string): void {
+        if (!line.trim()) {
+            return;
+        }
+        let message: ChunkerRpcMessage;
+        try {
+            message = JSON.parse(line) as ChunkerRpcMessage;
+        } catch {
+            // Not a protocol message, e.g. a library notice printed to stdout
+            this.appendStderr(line + "\n");
+            return;
+        }
+        if (message.method === "result") {
+            const request = this.pending.get(message.params.id);
+            if (request) {
+                const item = message.params.item as T;
+                request.results.push(item);
+                if (request.onResult) {
+                    const onResult = request.onResult;
+                    request.chain = request.chain.then(() => onResult(item));
+                }
+            }
+            return;
+        }
+        if (typeof message.id !== "number") {
+            return;
+        }
+        const request = this.pending.get(message.id);
+        if (!request) {
+            return;
+        }
+        this.pending.delete(message.id);
+        if (message.error) {
+            request.reject(new Error(message.error.message));
+        } else {
+            request.chain.then(
+                () => request.resolve(request.results),
+                request.reject,
+            );
+        }
+        if (this.pending.size === 0) {
+            this.setActive(false);
+        }
+    }
+
+    private appendStderr(data: string): void {
+        this.stderr = (this.stderr + data).slice(-MAX_STDERR_CHARS);
+    }
+
+    private onExit(
+        child: ChildProcessWithoutNullStreams,
+        error: Error,
+    ): void {
+        if (this.child !== child) {
+            return;
+        }
+        this.child = undefined;
+        for (const request of this.pending.values()) {
+            request.reject(error);
+        }
+        this.pending.clear();
+    }
+
+    // Only keep node alive while requests are in flight
+    private setActive(active: boolean): void {
+        const child = this.child;
+        if (!child) {
+            return;
+        }
+        // The stdio pipes are sockets at runtime, but typed as plain streams
+        const handles = [
+            child,
+            child.stdin,
+            child.stdout,
+            child.stderr,
+        ] as unknown as { ref(): void; unref(): void }[];
+        for (const handle of handles) {
+            if (active) {
+                handle.ref();
+            } else {
+                handle.unref();
+            }
+        }
+    }
+}
+
+// One server per script and argument list, so e.g. a different -jobs starts
+// its own server
+const chunkerServers = new Map<string, ChunkerServer<any>>();
+
+export function getChunkerServer<T>(
+    scriptPath: string,
+    serverArgs: string[] = [],
+): ChunkerServer<T> {
+    const key = JSON.stringify([scriptPath, ...serverArgs]);
+    let server = chunkerServers.get(key);
+    if (!server) {
+        server = new ChunkerServer<T>(scriptPath, serverArgs);
+        chunkerServers.set(key, server);
+    }
+    return server;
+}
+
 export async function withFileLock<T>(
     file: string,
     fn: () => Promise<T>,
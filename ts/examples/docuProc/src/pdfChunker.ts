@@ -4,19 +4,16 @@
 // This requires that python3 is on the PATH
 // and the pdfChunker.py script is in the dist directory.
 
-import { execFile } from "child_process";
 import path, { resolve } from "path";
 import { fileURLToPath } from "url";
-import { promisify } from "util";
 import fs from "fs/promises";
 
 import { PdfChunkDocumentation, PdfDocumentInfo } from "./pdfDocChunkSchema.js";
+import { getChunkerServer, runNdjsonChunker } from "./common.js";
 
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
 
-const execFilePromise = promisify(execFile);
-
 export type ChunkId = string;
 
 export interface Blob {
@@ -33,6 +30,7 @@ export interface Blob {
     bbox?: number[]; // Optional bounding box
     img_name?: string; // Optional image name
     img_path?: string; // Optional image path
+    lazy?: boolean; // page_image not rendered yet; the chunker's render_pages request renders it
     para_id?: number; // Optional paragraph ID
     image_chunk_ref?: string[]; // Optional reference to image chunk(s)
 }
@@ -108,47 +106,58 @@ export async function loadPdfChunksFromJson(
 export async function chunkifyPdfFiles(
     rootDir: string,
     filenames: string[],
+    onResult?: (result: ChunkedFile | ErrorItem) => void | Promise<void>,
+    jobs: number = 1,
+    useServer: boolean = true,
 ): Promise<(ChunkedFile | ErrorItem)[]> {
-    let output,
-        errors,
-        success = false;
+    let results: (ChunkedFile | ErrorItem)[];
     try {
         const chunkerPath = path.join(__dirname, "pdfChunker.py");
         const absChunkerPath = resolve(chunkerPath);
         const absFilenames = filenames.map((f) => path.join(__dirname, f));
         const outputDir = path.join(rootDir, "chunked-docs");
-        const { stdout, stderr } = await execFilePromise(
-            "python3",
-            [
-                "-X",
-                "utf8",
+        if (useServer) {
+            // A long-lived chunker keeps python and PyMuPDF loaded across imports
+            const server = getChunkerServer<ChunkedFile | ErrorItem>(
+                absChunkerPath,
+                ["-jobs", String(jobs)],
+            );
+            results = await server.chunk(absFilenames, outputDir, onResult);
+        } else {
+            // Results stream back one line per file; no stdout buffer limit needed
+            const run = await runNdjsonChunker<ChunkedFile | ErrorItem>(
                 absChunkerPath,
-                "-files",
-                ...absFilenames,
-                "-outdir",
-                outputDir,
-            ],
-            { maxBuffer: 64 * 1024 * 1024 }, // Super large buffer
-        );
-        output = stdout;
-        errors = stderr;
-        success = true;
+                [
+                    "-files",
+                    ...absFilenames,
+                    "-outdir",
+                    outputDir,
+                    "-jobs",
+                    String(jobs),
+                ],
+                onResult,
+            );
+            if (run.exitCode !== 0) {
+                return [
+                    {
+                        error:
+                            run.stderr ||
+                            `Chunker exited with code ${run.exitCode}`,
+                        output: run.stdout,
+                    },
+                ];
+            }
+            results = run.results;
+        }
     } catch (error: any) {
-        output = error?.stdout || "";
-        errors = error?.stderr || error.message || "Unknown error";
+        const errors = error?.stderr || error.message || "Unknown error";
+        return [{ error: errors, output: "" }];
     }
 
-    if (!success) {
-        return [{ error: errors, output: output }];
-    }
-    if (errors) {
-        return [{ error: errors, output: output }];
-    }
-    if (!output) {
+    if (results.length === 0) {
         return [{ error: "No output from chunker script" }];
     }
 
-    const results: (ChunkedFile | ErrorItem)[] = JSON.parse(output);
     for (const result of results) {
         if ("error" in result) {
             console.error("Error in chunker output:", result.error);
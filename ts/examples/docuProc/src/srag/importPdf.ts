@@ -11,15 +11,15 @@ import * as fs from "node:fs";
 import chalk, { ChalkInstance } from "chalk";
 import * as iapp from "interactive-app";
 import { Chunk, ChunkedFile, ErrorItem } from "./pdfDocSchema.js";
-import { promisify } from "node:util";
-import { execFile } from "node:child_process";
 
 import {
     OUTPUT_DIR,
     CHUNKED_DOCS_DIR,
     SRAG_MEM_DIR,
+    getChunkerServer,
     resolveFilePath,
     resolveAndValidateFiles,
+    runNdjsonChunker,
 } from "../common.js";
 import {
     CatalogEntryWithMeta,
@@ -30,8 +30,6 @@ import { assert } from "node:console";
 import { AppPrinter } from "../printer.js";
 import { ensureDir } from "@typeagent/agent-runtime";
 
-const execFilePromise = promisify(execFile);
-
 export function isInteractiveIo(
     io: iapp.InteractiveIo | AppPrinter,
 ): io is iapp.InteractiveIo {
@@ -60,10 +58,11 @@ function log(
 export async function chunkifyPdfFiles(
     outputDir: string,
     filenames: string[],
+    onResult?: (result: ChunkedFile | ErrorItem) => void | Promise<void>,
+    jobs: number = 1,
+    useServer: boolean = true,
 ): Promise<(ChunkedFile | ErrorItem)[]> {
-    let output,
-        errors,
-        success = false;
+    let results: (ChunkedFile | ErrorItem)[];
     try {
         const absChunkerPath = resolveFilePath("srag/pdfChunkerV2.py");
         const absFilenames = resolveAndValidateFiles(filenames);
@@ -72,38 +71,52 @@ export async function chunkifyPdfFiles(
             fs.mkdirSync(CHUNKED_DOCS_DIR, { recursive: true });
         }
 
-        const { stdout, stderr } = await execFilePromise(
-            "python3",
-            [
-                "-X",
-                "utf8",
+        if (useServer) {
+            // A long-lived chunker keeps python and PyMuPDF loaded across imports
+            const server = getChunkerServer<ChunkedFile | ErrorItem>(
                 absChunkerPath,
-                "-files",
-                ...absFilenames,
-                "-outdir",
+                ["-jobs", String(jobs)],
+            );
+            results = await server.chunk(
+                absFilenames,
                 CHUNKED_DOCS_DIR,
-            ],
-            { maxBuffer: 64 * 1024 * 1024 },
-        );
-        output = stdout;
-        errors = stderr;
-        success = true;
+                onResult,
+            );
+        } else {
+            // Results stream back one line per file; no stdout buffer limit needed
+            const run = await runNdjsonChunker<ChunkedFile | ErrorItem>(
+                absChunkerPath,
+                [
+                    "-files",
+                    ...absFilenames,
+                    "-outdir",
+                    CHUNKED_DOCS_DIR,
+                    "-jobs",
+                    String(jobs),
+                ],
+                onResult,
+            );
+            if (run.exitCode !== 0) {
+                return [
+                    {
+                        error:
+                            run.stderr ||
+                            `Chunker exited with code ${run.exitCode}`,
+                        output: run.stdout,
+                    },
+                ];
+            }
+            results = run.results;
+        }
     } catch (error: any) {
-        output = error?.stdout || "";
-        errors = error?.stderr || error.message || "Unknown error";
+        const errors = error?.stderr || error.message || "Unknown error";
+        return [{ error: errors, output: "" }];
     }
 
-    if (!success) {
-        return [{ error: errors, output: output }];
-    }
-    if (errors) {
-        return [{ error: errors, output: output }];
-    }
-    if (!output) {
+    if (results.length === 0) {
         return [{ error: "No output from chunker script" }];
     }
 
-    const results: (ChunkedFile | ErrorItem)[] = JSON.parse(output);
     for (const result of results) {
         if ("error" in result) {
             console.error("Error in chunker output:", result.error);
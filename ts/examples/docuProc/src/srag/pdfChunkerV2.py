@@ -7,18 +7,32 @@ import sys
 import json
 
 import pdfplumber # type: ignore
-import fitz # type: ignore
+# The pymupdf name, since importing fitz prints a deprecation notice on stdout,
+# which carries only chunker output (-ndjson lines, -server JSON-RPC)
+import pymupdf as fitz # type: ignore
 from PIL import Image # type: ignore
 
 import datetime
 import csv
-from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field, replace
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable
 from pathlib import Path
+import hashlib
+import importlib
+import math
+import shutil
 import re
+import struct
+import time
 
 IdType = str
 
+# Bump when a change to the chunker alters its output, so cached results are not reused
+CHUNKER_VERSION = "2.6"
+
 from dataclasses import dataclass
 from typing import Optional, List, Union, Dict, Any
 
@@ -34,6 +48,7 @@ class Blob:
     image_chunk_ref: Optional[List[str]] = None     # Pointer to the chunk that has the associated image (if this is a caption)
     para_id: Optional[int] = None  # Paragraph ID if needed
     paraHeader: Optional[Union[str, List[str]]] = None
+    lazy: bool = False  # A page_image not rendered yet (-page-images lazy): render_page_images writes it and returns its path
 
     def to_dict(self) -> Dict[str, Any]:
         result = {
@@ -44,6 +59,8 @@ class Blob:
             result["content"] = self.content
         if self.img_path:
             result["img_path"] = self.img_path
+        if self.lazy:
+            result["lazy"] = True
         if self.para_id is not None:
             result["para_id"] = self.para_id
         if self.paraHeader is not None:
@@ -54,6 +71,20 @@ class Blob:
             result["bbox"] = self.bbox
         return result
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Blob":
+        return cls(
+            blob_type=data["blob_type"],
+            start=data["start"],
+            content=data.get("content"),
+            bbox=data.get("bbox"),
+            img_path=data.get("img_path"),
+            image_chunk_ref=data.get("image_chunk_ref"),
+            para_id=data.get("para_id"),
+            paraHeader=data.get("paraHeader"),
+            lazy=data.get("lazy", False)
+        )
+
 @dataclass
 class Chunk:
     """A chunk at any level of nesting (e.g., a page, a paragraph, a table)."""
@@ -76,6 +107,16 @@ class Chunk:
             result["children"] = self.children
         return result
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Chunk":
+        return cls(
+            id=data["id"],
+            pageid=data["pageid"],
+            blobs=[Blob.from_dict(blob) for blob in data["blobs"]],
+            parentId=data.get("parentId"),
+            children=list(data.get("children", []))
+        )
+
 @dataclass
 class ChunkedFile:
     """A file with chunks."""
@@ -88,6 +129,20 @@ class ChunkedFile:
             "chunks": [chunk.to_dict() for chunk in self.chunks]
         }
 
+@dataclass
+class ChunkedFileSummary:
+    """Stdout stand-in for a ChunkedFile when the chunks are only written to its output file."""
+    fileName: str
+    outputPath: str
+    chunkCount: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "fileName": self.fileName,
+            "outputPath": self.outputPath,
+            "chunkCount": self.chunkCount
+        }
+
 @dataclass
 class ErrorItem:
     error: str
@@ -105,6 +160,229 @@ def custom_json(obj: object) -> dict[str, object]:
         return obj.to_dict()  # type: ignore
     else:
         raise TypeError(f"Cannot JSON serialize object of type {type(obj)}")
+
+class ChunkedFileWriter:
+    """
+    Writes a ChunkedFile JSON document one chunk at a time, so the dict tree of
+    the whole file is never built. Output is compact unless an indent is given,
+    in which case it matches json.dump(..., indent=indent). The file is written
+    under a temp name and only replaces output_path once it is complete.
+    """
+    def __init__(self, output_path: str, file_name: str, indent: Optional[int] = None):
+        self.output_path = output_path
+        self.tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        self.indent = indent
+        self.count = 0
+        self.separators = (",", ":") if indent is None else (",", ": ")
+        self.f = open(self.tmp_path, "w")
+        file_name_json = json.dumps(file_name)
+        if indent is None:
+            self.f.write(f'{{"fileName":{file_name_json},"chunks":[')
+        else:
+            pad = " " * indent
+            self.f.write(f'{{\n{pad}"fileName": {file_name_json},\n{pad}"chunks": [')
+
+    def write(self, chunk: Union[Chunk, Dict[str, Any]]) -> None:
+        chunk_json = json.dumps(chunk, default=custom_json, indent=self.indent, separators=self.separators)
+        if self.indent is not None:
+            pad = " " * (2 * self.indent)
+            chunk_json = "\n" + pad + chunk_json.replace("\n", "\n" + pad)
+        self.f.write(chunk_json if self.count == 0 else "," + chunk_json)
+        self.count += 1
+
+    def write_chunks(self, chunks: Iterable[Union[Chunk, Dict[str, Any]]]) -> None:
+        for chunk in chunks:
+            self.write(chunk)
+
+    def close(self) -> None:
+        if self.indent is None:
+            self.f.write("]}")
+        else:
+            pad = " " * self.indent
+            self.f.write(f"\n{pad}]\n}}" if self.count else "]\n}")
+        self.f.close()
+        os.replace(self.tmp_path, self.output_path)
+
+    def abort(self) -> None:
+        self.f.close()
+        os.remove(self.tmp_path)
+
+    def __enter__(self) -> "ChunkedFileWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+class ChunkedFileMsgpackWriter(ChunkedFileWriter):
+    """
+    MessagePack counterpart of ChunkedFileWriter. The file decodes (msgpack.unpack)
+    to the same {"fileName": ..., "chunks": [...]} tree as the JSON output. The
+    chunk count is patched into the array header on close, so chunks can still
+    be streamed; a reader can take them one at a time with Unpacker.read_array_header().
+    """
+    def __init__(self, output_path: str, file_name: str, indent: Optional[int] = None):
+        msgpack = import_optional("msgpack", "-format msgpack")
+        self.output_path = output_path
+        self.tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        self.count = 0
+        self.packer = msgpack.Packer()
+        self.f = open(self.tmp_path, "wb")
+        self.f.write(b"\x82" + self.packer.pack("fileName") + self.packer.pack(file_name) + self.packer.pack("chunks"))
+        self.count_offset = self.f.tell() + 1
+        self.f.write(b"\xdd" + struct.pack(">I", 0))  # array32, count filled in by close()
+
+    def write(self, chunk: Union[Chunk, Dict[str, Any]]) -> None:
+        self.f.write(self.packer.pack(chunk.to_dict() if isinstance(chunk, Chunk) else chunk))
+        self.count += 1
+
+    def close(self) -> None:
+        self.f.seek(self.count_offset)
+        self.f.write(struct.pack(">I", self.count))
+        self.f.close()
+        os.replace(self.tmp_path, self.output_path)
+
+PARQUET_ROW_GROUP_ROWS = 16384
+
+class ChunkedFileParquetWriter(ChunkedFileWriter):
+    """
+    Parquet table of blobs, one row per blob, written in row groups of
+    PARQUET_ROW_GROUP_ROWS so memory stays bounded. A chunk without blobs gets
+    one row with a null blob_index. Text content is in "content"; list content
+    (table rows) is in "content_rows". A chunk's children are the chunks whose
+    parentId names it, in row order. The file name is kept in the schema metadata.
+    """
+    def __init__(self, output_path: str, file_name: str, indent: Optional[int] = None):
+        pa = import_optional("pyarrow", "-format parquet")
+        pq = import_optional("pyarrow.parquet", "-format parquet", "pyarrow")
+        self.pa = pa
+        self.output_path = output_path
+        self.tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        self.count = 0
+        self.schema = pa.schema([
+            ("id", pa.string()),
+            ("pageid", pa.string()),
+            ("parentId", pa.string()),
+            ("blob_index", pa.int32()),
+            ("blob_type", pa.string()),
+            ("start", pa.int64()),
+            ("content", pa.string()),
+            ("content_rows", pa.list_(pa.string())),
+            ("bbox", pa.list_(pa.float64())),
+            ("img_path", pa.string()),
+            ("para_id", pa.int64()),
+            ("paraHeader", pa.list_(pa.string())),
+            ("image_chunk_ref", pa.list_(pa.string())),
+            ("lazy", pa.bool_()),
+        ], metadata={"fileName": file_name, "chunkerVersion": CHUNKER_VERSION})
+        self.columns: dict[str, list[Any]] = {name: [] for name in self.schema.names}
+        self.writer = pq.ParquetWriter(self.tmp_path, self.schema)
+
+    def add_row(self, chunk: Chunk, blob_index: Optional[int], blob: Optional[Blob]) -> None:
+        columns = self.columns
+        columns["id"].append(chunk.id)
+        columns["pageid"].append(chunk.pageid)
+        columns["parentId"].append(chunk.parentId)
+        columns["blob_index"].append(blob_index)
+        columns["blob_type"].append(blob.blob_type if blob else None)
+        columns["start"].append(blob.start if blob else None)
+        content = blob.content if blob else None
+        columns["content"].append(content if not isinstance(content, list) else None)
+        columns["content_rows"].append(content if isinstance(content, list) else None)
+        columns["bbox"].append(blob.bbox if blob else None)
+        columns["img_path"].append(blob.img_path if blob else None)
+        columns["para_id"].append(blob.para_id if blob else None)
+        header = blob.paraHeader if blob else None
+        columns["paraHeader"].append([header] if isinstance(header, str) else header)
+        columns["image_chunk_ref"].append(blob.image_chunk_ref if blob else None)
+        columns["lazy"].append(blob.lazy if blob else None)
+
+    def write(self, chunk: Union[Chunk, Dict[str, Any]]) -> None:
+        if not isinstance(chunk, Chunk):
+            chunk = Chunk.from_dict(chunk)
+        if not chunk.blobs:
+            self.add_row(chunk, None, None)
+        for blob_index, blob in enumerate(chunk.blobs):
+            self.add_row(chunk, blob_index, blob)
+        self.count += 1
+        if len(self.columns["id"]) >= PARQUET_ROW_GROUP_ROWS:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.columns["id"]:
+            self.writer.write_table(self.pa.Table.from_pydict(self.columns, schema=self.schema))
+            self.columns = {name: [] for name in self.schema.names}
+
+    def close(self) -> None:
+        self.flush()
+        self.writer.close()
+        os.replace(self.tmp_path, self.output_path)
+
+    def abort(self) -> None:
+        self.writer.close()
+        os.remove(self.tmp_path)
+
+OUTPUT_FORMATS = ("json", "msgpack", "parquet")
+OUTPUT_WRITERS = {
+    "json": ChunkedFileWriter,
+    "msgpack": ChunkedFileMsgpackWriter,
+    "parquet": ChunkedFileParquetWriter,
+}
+
+def import_optional(module_name: str, feature: str, package: Optional[str] = None) -> Any:
+    try:
+        return importlib.import_module(module_name)
+    except ImportError as err:
+        package = package or module_name
+        raise RuntimeError(f"{feature} needs the {package} package (pip install {package})") from err
+
+def require_output_format(output_format: str) -> None:
+    """Fail early when an output format is unknown or its package is missing."""
+    if output_format == "msgpack":
+        import_optional("msgpack", "-format msgpack")
+    elif output_format == "parquet":
+        import_optional("pyarrow.parquet", "-format parquet", "pyarrow")
+    elif output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+
+def chunked_output_path(output_dir: Union[str, Path], file_path: str, output_format: str = "json") -> str:
+    return os.path.join(output_dir, f"{os.path.basename(file_path)}-chunked.{output_format}")
+
+def read_chunked_file(path: str) -> ChunkedFile:
+    """Read a -chunked.json, .msgpack or .parquet file back into a ChunkedFile."""
+    if path.endswith(".parquet"):
+        pq = import_optional("pyarrow.parquet", "-format parquet", "pyarrow")
+        table = pq.read_table(path)
+        chunks: dict[str, Chunk] = {}
+        for row in table.to_pylist():
+            chunk = chunks.get(row["id"])
+            if chunk is None:
+                chunk = Chunk(row["id"], row["pageid"], [], row["parentId"], [])
+                chunks[chunk.id] = chunk
+                if chunk.parentId in chunks:
+                    chunks[chunk.parentId].children.append(chunk.id)
+            if row["blob_index"] is not None:
+                chunk.blobs.append(Blob(
+                    blob_type=row["blob_type"],
+                    start=row["start"],
+                    content=row["content"] if row["content_rows"] is None else row["content_rows"],
+                    bbox=row["bbox"],
+                    img_path=row["img_path"],
+                    image_chunk_ref=row["image_chunk_ref"],
+                    para_id=row["para_id"],
+                    paraHeader=row["paraHeader"]
+                ))
+        return ChunkedFile(table.schema.metadata[b"fileName"].decode("utf-8"), list(chunks.values()))
+    if path.endswith(".msgpack"):
+        msgpack = import_optional("msgpack", "-format msgpack")
+        with open(path, "rb") as f:
+            data = msgpack.unpack(f)
+    else:
+        with open(path, "r") as f:
+            data = json.load(f)
+    return ChunkedFile(data["fileName"], [Chunk.from_dict(chunk) for chunk in data["chunks"]])
     
 last_ts: datetime.datetime = datetime.datetime.now()
 
@@ -125,18 +403,546 @@ def generate_id() -> IdType:
     last_ts = next_ts
     return next_ts.strftime("%Y%m%d-%H%M%S.%f")
 
+
+ID_MODES = ("content", "timestamp")
+DOC_KEY_LENGTH = 16
+
+def make_chunk_id(doc_key: str, page_num: int, *path: Union[int, str]) -> IdType:
+    """Generate a deterministic chunk ID.
+
+    IDs are the document key (see make_doc_key), the 0-based page and the
+    chunk's position on that page, e.g. 3f9a...-p4, 3f9a...-p4-i0 (image 0) or
+    3f9a...-p4-2-1 (paragraph 2, sub-chunk 1). They are stable across runs,
+    do not change when the file is moved, and need no shared state between
+    processes.
+    """
+    return "-".join([doc_key, f"p{page_num}", *(str(part) for part in path)])
+
+def make_doc_key(file_hash: str) -> str:
+    """
+    Id prefix of a document: the start of its content hash, so identical copies
+    get the same ids. When an edited PDF is re-chunked with the chunk cache on,
+    its unchanged pages keep the ids of the previous version (see
+    prepare_page_reuse); the other pages use the new content's key.
+    """
+    return file_hash[:DOC_KEY_LENGTH]
+
+def rekey_chunks(chunks: list[Chunk], new_id: Callable[[IdType], IdType]) -> None:
+    """Replace every chunk id (and the references to it) by new_id(old id)."""
+    ids = {chunk.id: new_id(chunk.id) for chunk in chunks}
+    for chunk in chunks:
+        chunk.id = ids[chunk.id]
+        chunk.pageid = ids.get(chunk.pageid, chunk.pageid)
+        if chunk.parentId is not None:
+            chunk.parentId = ids.get(chunk.parentId, chunk.parentId)
+        if chunk.children:
+            chunk.children = [ids.get(child, child) for child in chunk.children]
+
 def get_FNameWithoutExtension(file_path: str) -> str:
     return Path(file_path).stem
 
+def hash_file(file_path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def write_json_atomic(path: str, data: Any, indent: Optional[int] = None) -> None:
+    # Concurrent -jobs workers may write the same cache file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, default=custom_json, indent=indent)
+    os.replace(tmp_path, path)
+
+CHUNK_CACHE_SIZE_MB = 1024
+
+class ChunkCache:
+    """
+    On-disk cache of chunking results, one JSON entry per (PDF content hash,
+    chunker version + options). A pointer per source path records the last entry
+    chunked from that path, so an edited PDF can reuse the page analyses and
+    chunk ids of the pages that did not change. Re-chunking an edited PDF
+    replaces the entry of its previous version, and once the cache is over
+    max_bytes the least recently used files are removed.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = CHUNK_CACHE_SIZE_MB << 20):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def entry_path(self, file_hash: str, options_key: str) -> str:
+        return os.path.join(self.cache_dir, f"{file_hash}-{options_key}.json")
+
+    def pointer_path(self, file_path: str, options_key: str) -> str:
+        path_key = hashlib.sha256(os.path.abspath(file_path).encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.cache_dir, f"path-{path_key}-{options_key}.json")
+
+    def read(self, path: str) -> Optional[dict[str, Any]]:
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or entry.get("version") != CHUNKER_VERSION:
+            return None
+        return entry
+
+    def load(self, file_hash: str, options_key: str) -> Optional[dict[str, Any]]:
+        path = self.entry_path(file_hash, options_key)
+        entry = self.read(path)
+        if entry is not None:
+            # prune() goes by modification time, so a used entry is kept longest
+            for used_path in (path, self.chunks_path(file_hash, options_key, entry.get("format", "json"))):
+                try:
+                    os.utime(used_path)
+                except OSError:
+                    pass
+        return entry
+
+    def load_previous(self, file_path: str, options_key: str) -> Optional[dict[str, Any]]:
+        pointer = self.read(self.pointer_path(file_path, options_key))
+        if pointer is None:
+            return None
+        return self.load(pointer["fileHash"], options_key)
+
+    def chunks_path(self, file_hash: str, options_key: str, output_format: str = "json") -> str:
+        return os.path.join(self.cache_dir, f"{file_hash}-{options_key}.chunks.{output_format}")
+
+    def store(self, file_path: str, options_key: str, entry: dict[str, Any], output_path: str) -> None:
+        """Record an entry; the chunks themselves are kept as a copy of the written -chunked file."""
+        previous = self.read(self.pointer_path(file_path, options_key))
+        chunks_path = self.chunks_path(entry["fileHash"], options_key, entry.get("format", "json"))
+        tmp_path = f"{chunks_path}.{os.getpid()}.tmp"
+        shutil.copyfile(output_path, tmp_path)
+        os.replace(tmp_path, chunks_path)
+        write_json_atomic(self.entry_path(entry["fileHash"], options_key), entry)
+        write_json_atomic(
+            self.pointer_path(file_path, options_key),
+            {"version": CHUNKER_VERSION, "fileHash": entry["fileHash"]}
+        )
+        if previous is not None and previous["fileHash"] != entry["fileHash"]:
+            # The previous version of an edited file
+            self.remove(previous["fileHash"], options_key, entry.get("format", "json"))
+        self.prune()
+
+    def remove(self, file_hash: str, options_key: str, output_format: str = "json") -> None:
+        for path in (self.entry_path(file_hash, options_key), self.chunks_path(file_hash, options_key, output_format)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def prune(self) -> None:
+        """Remove the least recently used files until the cache fits in max_bytes."""
+        files = []
+        for dir_entry in os.scandir(self.cache_dir):
+            # .tmp files are being written by another -jobs worker
+            if dir_entry.is_file() and not dir_entry.name.endswith(".tmp"):
+                stat = dir_entry.stat()
+                files.append((stat.st_mtime, stat.st_size, dir_entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+class PdfDocSession:
+    """
+    Owns the open document handles for one chunkify() run.
+    The fitz document is opened once up front; the pdfplumber handle is only
+    opened the first time something asks for it.
+    """
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.doc: fitz.Document = fitz.open(file_path)
+        self._plumber_pdf = None
+
+    @property
+    def plumber_pdf(self):
+        if self._plumber_pdf is None:
+            self._plumber_pdf = pdfplumber.open(self.file_path)
+        return self._plumber_pdf
+
+    def close(self) -> None:
+        if self._plumber_pdf is not None:
+            self._plumber_pdf.close()
+            self._plumber_pdf = None
+        self.doc.close()
+
+    def __enter__(self) -> "PdfDocSession":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+class ImageBBoxIndex:
+    """
+    Y-bucket index over the image chunks of one page, for caption lookup.
+
+    A line can only be a title or caption of an image when its y0 lies in
+    [img.y0 - image_title_buffer, img.y1 + image_label_buffer], so each image is
+    registered in every bucket that band overlaps. A lookup then only tests the
+    images in the line's bucket, in original page order.
+    """
+    BUCKET_SIZE = 50.0
+
+    def __init__(
+        self,
+        image_chunks: Iterable[Chunk],
+        image_title_buffer: float = 30.0,
+        image_label_buffer: float = 50.0
+    ):
+        self.image_title_buffer = image_title_buffer
+        self.image_label_buffer = image_label_buffer
+        self.buckets: dict[int, list[tuple[List[float], Chunk]]] = {}
+        self.entries: list[tuple[List[float], Chunk]] = []
+
+        for img_chunk in image_chunks:
+            if not img_chunk.blobs:
+                continue
+            img_blob = img_chunk.blobs[0]
+            if img_blob.blob_type != "image" or not img_blob.bbox:
+                continue
+
+            x0_img, y0_img, x1_img, y1_img = img_blob.bbox
+            entry = ([x0_img, y0_img, x1_img, y1_img], img_chunk)
+            first = self._bucket(min(y0_img - image_title_buffer, y1_img))
+            last = self._bucket(max(y1_img, y0_img) + image_label_buffer)
+            for key in range(first, last + 1):
+                self.buckets.setdefault(key, []).append(entry)
+            self.entries.append(entry)
+
+    def _bucket(self, y: float) -> int:
+        return math.floor(y / self.BUCKET_SIZE)
+
+    def find(self, line_bbox: List[float]) -> List[Chunk]:
+        x0_line, y0_line, x1_line, y1_line = line_bbox
+        if not self.entries:
+            return []
+        if y0_line <= y1_line:
+            candidates = self.buckets.get(self._bucket(y0_line), [])
+        else:
+            candidates = self.entries  # degenerate line bbox; the band bound does not hold
+
+        close_chunks: List[Chunk] = []
+        for (x0_img, y0_img, x1_img, y1_img), img_chunk in candidates:
+            # Allow **partial** X-overlap
+            if x1_line < x0_img or x0_line > x1_img:
+                continue
+
+            # Title logic: Slightly above or inside
+            is_image_title = (y0_line >= y0_img - self.image_title_buffer) and (y1_line <= y1_img)
+            # Caption logic: Below image within buffer
+            is_image_caption = (y0_line >= y1_img) and (y1_line <= y1_img + self.image_label_buffer)
+
+            if is_image_title or is_image_caption:
+                close_chunks.append(img_chunk)
+        return close_chunks
+
+class ChunkerProfile:
+    """
+    Opt-in instrumentation for -profile (or PDFCHUNKER_PROFILE=1): wall time and
+    call counts per chunker step, and wall time per page. Steps are timed by
+    wrapping the chunker's bound methods, so an unprofiled run pays nothing.
+    """
+    OUTLIER_FACTOR = 3.0
+    OUTLIER_MIN_SECONDS = 0.05
+    MAX_OUTLIERS = 20
+
+    def __init__(self):
+        self.seconds: dict[str, float] = {}
+        self.calls: dict[str, int] = {}
+        self.page_seconds: dict[int, float] = {}
+
+    def add(self, step: str, seconds: float, calls: int = 1) -> None:
+        self.seconds[step] = self.seconds.get(step, 0.0) + seconds
+        self.calls[step] = self.calls.get(step, 0) + calls
+
+    def wrap(self, step: str, func: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(step, time.perf_counter() - t0)
+        return timed
+
+    def wrap_page(self, func: Callable[[fitz.Page], Any]) -> Callable[[fitz.Page], Any]:
+        def timed(page: fitz.Page):
+            t0 = time.perf_counter()
+            try:
+                return func(page)
+            finally:
+                self.page_seconds[page.number] = time.perf_counter() - t0
+        return timed
+
+    def reset(self) -> None:
+        self.seconds.clear()
+        self.calls.clear()
+        self.page_seconds.clear()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"seconds": dict(self.seconds), "calls": dict(self.calls), "pageSeconds": dict(self.page_seconds)}
+
+    def merge(self, other: Dict[str, Any]) -> None:
+        """Fold in a to_dict() snapshot from a -workers process."""
+        for step, seconds in other["seconds"].items():
+            self.add(step, seconds, other["calls"][step])
+        self.page_seconds.update(other["pageSeconds"])
+
+    def report(self, file_name: str) -> Dict[str, Any]:
+        page_times = sorted(self.page_seconds.values())
+        median = page_times[len(page_times) // 2] if page_times else 0.0
+        threshold = max(median * self.OUTLIER_FACTOR, self.OUTLIER_MIN_SECONDS)
+        outliers = sorted(
+            ((page_num, seconds) for page_num, seconds in self.page_seconds.items() if seconds > threshold),
+            key=lambda item: item[1],
+            reverse=True
+        )[:self.MAX_OUTLIERS]
+        return {
+            "fileName": file_name,
+            "steps": {
+                step: {"seconds": round(self.seconds[step], 6), "calls": self.calls[step]}
+                for step in sorted(self.seconds, key=self.seconds.get, reverse=True)
+            },
+            "pages": {
+                "count": len(page_times),
+                "totalSeconds": round(sum(page_times), 6),
+                "medianSeconds": round(median, 6),
+                "maxSeconds": round(page_times[-1], 6) if page_times else 0.0,
+                "outliers": [{"page": page_num, "seconds": round(seconds, 6)} for page_num, seconds in outliers]
+            }
+        }
+
+    def save(self, output_path: str, file_name: str) -> None:
+        with open(output_path, "w") as f:
+            json.dump(self.report(file_name), f, indent=2)
+
+@dataclass
+class PageAnalysis:
+    """Per-page output of PDFChunker.analyze_page, before chunk ids are assigned."""
+    page_num: int
+    page_image_path: Optional[str]
+    paragraphs: list[tuple[list[str], str, list[Any]]]  # related refs are Chunks, or image names across processes
+    tables: list[tuple[list[float], list[list[str]]]] = field(default_factory=list)  # (bbox, rows)
+    profile: Optional[Dict[str, Any]] = None  # ChunkerProfile snapshot, from -workers processes
+
+PAGE_IMAGE_MODES = ("none", "lazy", "eager")
+# Chunk tree layouts. "v1" (the layout of src/pdfChunker.py) numbers pages from 0
+# and keeps each paragraph on its page; "v2" numbers pages from 1, joins a
+# paragraph that spills over into the next page and tags text with paraHeader.
+CHUNKER_STRATEGIES = ("v1", "v2")
+# classify_page: "text" pages go through the line pipeline, the others take the fast path
+PAGE_KINDS = ("text", "scan", "images", "blank")
+SCAN_MIN_IMAGE_COVERAGE = 0.5
+# Steps timed by -profile, besides "json_write"; pixmap saves are save_image_xref and render_page_image
+PROFILED_METHODS = (
+    "get_lines_from_dict",
+    "extract_line_entries",
+    "assemble_merged_lines",
+    "_find_nearest_image_chunk",
+    "split_paragraphs",
+    "merge_single_line_headings",
+    "chunk_paragraph_by_sentence",
+    "chunk_paragraphs_by_sentence",
+    "is_table_like",
+    "extract_page_tables",
+    "classify_page",
+    "analyze_textless_page",
+    "load_page_images",
+    "save_image_xref",
+    "render_page_image",
+    "save_json",
+)
+TABLE_MIN_ROWS = 3
+# A line can be a table cell when it is narrow or holds only a few words
+TABLE_MAX_CELL_WIDTH = 0.25     # fraction of the page width
+TABLE_MAX_CELL_WORDS = 4
+
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.?!])\s+')
+PARA_HEADER_RE = re.compile(r'\[(.*?)\]:')
+
+class WordTokenizer:
+    """Default tokenizer: whitespace-separated words, the chunker's original measure."""
+    name = "words"
+
+    def count_batch(self, texts: list[str]) -> list[int]:
+        return [len(text.split()) for text in texts]
+
+    def split(self, text: str, max_tokens: int) -> list[str]:
+        words = text.split()
+        return [" ".join(words[i:i + max_tokens]) for i in range(0, len(words), max_tokens)]
+
+class TiktokenTokenizer:
+    """
+    BPE token counts from tiktoken, an optional dependency. tiktoken reads its
+    vocab files from TIKTOKEN_CACHE_DIR when that is set, so a local copy of
+    the vocab works offline.
+    """
+    def __init__(self, encoding_name: str = "cl100k_base"):
+        try:
+            import tiktoken  # type: ignore
+        except ImportError as err:
+            raise RuntimeError("-tokenizer tiktoken needs the tiktoken package (pip install tiktoken)") from err
+        self.name = f"tiktoken:{encoding_name}"
+        self.encoding = tiktoken.get_encoding(encoding_name)
+
+    def count_batch(self, texts: list[str]) -> list[int]:
+        return [len(tokens) for tokens in self.encoding.encode_ordinary_batch(texts)]
+
+    def split(self, text: str, max_tokens: int) -> list[str]:
+        tokens = self.encoding.encode_ordinary(text)
+        return [self.encoding.decode(tokens[i:i + max_tokens]).strip() for i in range(0, len(tokens), max_tokens)]
+
+def make_tokenizer(spec: str) -> Union[WordTokenizer, TiktokenTokenizer]:
+    """"words", or "tiktoken[:ENCODING]" (default encoding cl100k_base)."""
+    if spec == "words":
+        return WordTokenizer()
+    if spec == "tiktoken" or spec.startswith("tiktoken:"):
+        return TiktokenTokenizer(spec.partition(":")[2] or "cl100k_base")
+    raise ValueError(f"Unknown tokenizer: {spec}")
+
+def pack_sentences(sentences: list[str], counts: list[int], max_tokens: int, overlap_tokens: int = 0) -> list[str]:
+    """
+    Greedily pack sentences into chunks of at most max_tokens. With overlap_tokens,
+    a chunk starts with the trailing sentences of the previous one that fit in
+    that budget. Token totals are per-sentence sums, so a chunk can be off by a
+    token or so at sentence joins with BPE tokenizers.
+    """
+    chunks: list[str] = []
+    current: list[str] = []
+    current_counts: list[int] = []
+    total = 0
+    for sentence, count in zip(sentences, counts):
+        if current and total + count > max_tokens:
+            chunks.append(" ".join(current))
+            keep = 0
+            kept_total = 0
+            while keep < len(current):
+                next_count = current_counts[-1 - keep]
+                if kept_total + next_count > overlap_tokens or kept_total + next_count + count > max_tokens:
+                    break
+                kept_total += next_count
+                keep += 1
+            current = current[len(current) - keep:]
+            current_counts = current_counts[len(current_counts) - keep:]
+            total = kept_total
+        current.append(sentence)
+        current_counts.append(count)
+        total += count
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
 class PDFChunker:
-    def __init__(self, file_path: str, output_dir: str = "output", debug: bool = False):
+    def __init__(
+        self,
+        file_path: str,
+        output_dir: str = "output",
+        debug: bool = False,
+        workers: int = 1,
+        page_images: str = "lazy",
+        image_cache_dir: Optional[str] = None,
+        chunk_cache_dir: Optional[str] = None,
+        chunk_cache_size_mb: int = CHUNK_CACHE_SIZE_MB,
+        id_mode: str = "content",
+        tables: bool = True,
+        profile: bool = False,
+        tokenizer: str = "words",
+        max_tokens: int = 200,
+        overlap_tokens: int = 0,
+        output_format: str = "json",
+        strategy: str = "v2"
+    ):
+        if strategy not in CHUNKER_STRATEGIES:
+            raise ValueError(f"Unknown chunker strategy: {strategy}")
+        self.strategy = strategy
         self.debug = debug
+        require_output_format(output_format)
+        self.output_format = output_format
+        # Text paragraphs are split into sentence chunks of at most max_tokens tokenizer tokens
+        self.tokenizer = make_tokenizer(tokenizer)
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.id_mode = id_mode
+        self.tables = tables
+        self.workers = workers
+        # "none": no page renders; "lazy": page_image blobs are marked lazy and have
+        # no path until rendered on request (render_page_images); "eager": render
+        # every page while chunking
+        self.page_images = page_images
         self.file_path = file_path
         self.pdf_name = get_FNameWithoutExtension(file_path)
         self.output_dir = Path(output_dir) / self.pdf_name
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Embedded images are stored once per distinct content, shared across documents
+        self.image_cache_dir = Path(image_cache_dir) if image_cache_dir else Path(output_dir) / ".image-cache"
+        self.image_cache_dir.mkdir(parents=True, exist_ok=True)
+        self.image_paths_by_xref: dict[int, str] = {}
+        self.image_digests_by_xref: dict[int, str] = {}
+        # Incremental re-chunking state, only used with a chunk cache
+        self.chunk_cache = ChunkCache(chunk_cache_dir, chunk_cache_size_mb << 20) if chunk_cache_dir else None
+        self.options_key = hashlib.sha256(json.dumps({
+            "version": CHUNKER_VERSION,
+            "page_images": page_images,
+            "image_cache_dir": str(self.image_cache_dir),
+            "id_mode": id_mode,
+            "tables": tables,
+            "tokenizer": self.tokenizer.name,
+            "max_tokens": max_tokens,
+            "overlap_tokens": overlap_tokens,
+            "format": output_format,
+            "strategy": strategy
+        }, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        self.file_hash: Optional[str] = None
+        self.doc_key: Optional[str] = None
+        self.page_hashes: list[str] = []
+        self.reused_page_records: dict[int, dict[str, Any]] = {}
+        self.reused_page_ids: dict[int, list[IdType]] = {}
+        self.page_ids_used: dict[int, list[IdType]] = {}
+        self.page_records: dict[int, dict[str, Any]] = {}
         self.doc_table_data = {}
         self.doc_image_chunksmap = {}
+        self.doc_image_index: dict[int, ImageBBoxIndex] = {}
+        self.session: Optional[PdfDocSession] = None
+        self.chunk_count = 0    # chunks written by the last save_json
+        self.profile: Optional[ChunkerProfile] = None
+        if profile:
+            self.profile = ChunkerProfile()
+            for method in PROFILED_METHODS:
+                setattr(self, method, self.profile.wrap(method, getattr(self, method)))
+            self.analyze_page = self.profile.wrap_page(self.analyze_page)
+
+    def get_file_hash(self) -> str:
+        if self.file_hash is None:
+            self.file_hash = hash_file(self.file_path)
+        return self.file_hash
+
+    def get_doc_key(self) -> str:
+        if self.doc_key is None:
+            self.doc_key = make_doc_key(self.get_file_hash())
+        return self.doc_key
+
+    def new_chunk_id(self, page_num: int, *path: Union[int, str]) -> IdType:
+        if self.id_mode == "timestamp":
+            return generate_id()
+        return make_chunk_id(self.get_doc_key(), page_num, *path)
+
+    def get_session(self) -> PdfDocSession:
+        """Return the document session for the current run, opening one if needed."""
+        if self.session is None:
+            self.session = PdfDocSession(self.file_path)
+        return self.session
+
+    def close_session(self) -> None:
+        if self.session is not None:
+            self.session.close()
+            self.session = None
 
     def debug_print_lines(self, chunks: List[Chunk]) -> None:
         """
@@ -220,6 +1026,48 @@ class PDFChunker:
 
         return detected_tables
     
+    def is_table_like(self, line_entries: list[dict], page_width: float) -> bool:
+        """
+        Cheap gate in front of pdfplumber, using the line entries text extraction
+        already has: a page is table-like when at least TABLE_MIN_ROWS rows hold
+        two or more cell-like lines (narrow, or only a few words), starting at
+        two or more shared x positions. The lines of running prose, even in two
+        columns side by side, are too wide and too wordy to count as cells.
+        """
+        rows: dict[int, list[float]] = {}
+        for entry in line_entries:
+            narrow = entry["x1"] - entry["x0"] < TABLE_MAX_CELL_WIDTH * page_width
+            if narrow or len(entry["text"].split()) <= TABLE_MAX_CELL_WORDS:
+                rows.setdefault(round(entry["y0"] / 2), []).append(entry["x0"])
+
+        multi_cell_rows = 0
+        column_hits: dict[int, int] = {}
+        for row_x0s in rows.values():
+            if len(row_x0s) < 2:
+                continue
+            multi_cell_rows += 1
+            for column in {round(x0 / 5) for x0 in row_x0s}:
+                column_hits[column] = column_hits.get(column, 0) + 1
+
+        aligned_columns = sum(1 for hits in column_hits.values() if hits >= TABLE_MIN_ROWS)
+        return multi_cell_rows >= TABLE_MIN_ROWS and aligned_columns >= 2
+
+    def extract_page_tables(self, page_num: int) -> list[tuple[list[float], list[list[str]]]]:
+        """
+        Tables on one page via pdfplumber, as (bbox, rows) with empty rows dropped.
+        Uses the session's pdfplumber document, so the PDF is parsed once per run.
+        """
+        pdf = self.get_session().plumber_pdf
+        if page_num >= len(pdf.pages):
+            return []
+
+        page_tables = []
+        for table in pdf.pages[page_num].find_tables():
+            rows = [[cell or "" for cell in row] for row in table.extract() if any(row)]
+            if rows:
+                page_tables.append((list(table.bbox), rows))
+        return page_tables
+
     def print_tables(self, tables: list[tuple[list[float], list[list[str]]]]) -> None:
         if self.debug:
             for idx, (bbox, table_data) in enumerate(tables):
@@ -264,6 +1112,31 @@ class PDFChunker:
         image_title_buffer: float = 30.0,
         image_label_buffer: float = 50.0
     ) -> Optional[tuple[int, List[Chunk]]]:
+        """
+        Find the image chunks this line is a title or caption for, using the
+        page's ImageBBoxIndex. Same matches, in the same order, as the linear
+        scan in _find_nearest_image_chunk_orig.
+        """
+        index = self.doc_image_index.get(page_num)
+        if index is None:
+            index = ImageBBoxIndex(self.doc_image_chunksmap.get(page_num, {}).values())
+            self.doc_image_index[page_num] = index
+
+        if (image_title_buffer, image_label_buffer) != (index.image_title_buffer, index.image_label_buffer):
+            return self._find_nearest_image_chunk_orig(page_num, line_bbox, image_title_buffer, image_label_buffer)
+
+        close_chunks = index.find(line_bbox)
+        if close_chunks:
+            return (page_num, close_chunks)
+        return None
+
+    def _find_nearest_image_chunk_orig(
+        self,
+        page_num: int,
+        line_bbox: List[float],
+        image_title_buffer: float = 30.0,
+        image_label_buffer: float = 50.0
+    ) -> Optional[tuple[int, List[Chunk]]]:
 
         x0_line, y0_line, x1_line, y1_line = line_bbox
         close_chunks: List[Chunk] = []
@@ -318,11 +1191,14 @@ class PDFChunker:
         line_entries.sort(key=sort_key)
 
     def get_lines_from_dict(self, page: fitz.Page) -> list[tuple[str, str, list[Chunk]]]:
-        Y_THRESHOLD = 2.0  
-        X_GAP_THRESHOLD = 15.0
-        PARA_GAP_THRESHOLD = 8.0  
-        PARA_MARKER = "<PARA_BREAK>"
+        line_entries = self.extract_line_entries(page)
+        return self.assemble_merged_lines(line_entries)
 
+    def extract_line_entries(self, page: fitz.Page) -> list[dict]:
+        """
+        Collect the non-empty text lines of a page with their bbox, font size,
+        bold flag and image title/caption label, sorted in reading order.
+        """
         data = page.get_text("dict")  
         line_entries = []
 
@@ -394,7 +1270,133 @@ class PDFChunker:
             print(f"\n--- DEBUG Line entries: Found {len(line_entries)} lines ---")
             for entry in line_entries:
                 print(f"  Line: {entry['text']}, Label: {entry['label']}, BBox: ({entry['x0']}, {entry['y0']}, {entry['x1']}, {entry['y1']})")
+        return line_entries
+
+    def assemble_merged_lines(self, line_entries: list[dict]) -> list[tuple[str, str, list[Chunk]]]:
+        """
+        Merge same-row line fragments and insert <PARA_BREAK> markers on bold/size
+        changes and vertical gaps. Single linear pass with the same output as
+        assemble_merged_lines_orig: instead of deleting merged entries from the
+        list it keeps the pending merged line aside, and the average font size
+        over the remaining entries is kept as a running sum.
+        The "v1" strategy only breaks on vertical gaps, like the V1 chunker.
+        """
+        Y_THRESHOLD = 2.0  
+        X_GAP_THRESHOLD = 15.0
+        PARA_GAP_THRESHOLD = 8.0  
+        PARA_MARKER = "<PARA_BREAK>"
+        style_breaks = self.strategy != "v1"
+
+        merged_lines: list[tuple[str, str, List[Chunk]]] = []
+        n = len(line_entries)
+        if n == 0:
+            return merged_lines
+
+        # Each merge replaces two entries by one with the larger font size
+        font_size_sum = sum(e["font_size"] for e in line_entries)
+        entry_count = n
+
+        prev_entry: Optional[dict] = None
+        current: Optional[dict] = line_entries[0]
+        next_index = 1  # entry after current; everything before it is consumed
+        while current is not None:
+            current_text = current["text"]
+            current_label = current["label"]
+            current_chunks = current["related_chunks"]
+            current_bold = current["is_bold"]
+            current_font_size = current["font_size"]
+
+            x0_c, y0_c, x1_c, y1_c = current["x0"], current["y0"], current["x1"], current["y1"]
+
+            # Insert explicit paragraph break before bold or significantly large-font lines
+            if style_breaks and prev_entry is not None:
+                if (current_bold and not prev_entry["is_bold"]) or \
+                (current_font_size > prev_entry["font_size"] + 1.0):
+                    merged_lines.append((PARA_MARKER, "text", []))
+
+            if current_label in ["image", "table"]:
+                j = next_index
+                while j < n:
+                    next_line = line_entries[j]
+                    if next_line["y0"] - y1_c < PARA_GAP_THRESHOLD:
+                        next_line["label"] = current_label
+                        next_line["related_chunks"] = current_chunks
+                        j += 1
+                    else:
+                        break
+
+            if next_index < n:
+                next_line = line_entries[next_index]
+                x0_n, y0_n, x1_n, y1_n = next_line["x0"], next_line["y0"], next_line["x1"], next_line["y1"]
+                text_n, label_n, chunks_n = next_line["text"], next_line["label"], next_line["related_chunks"]
+
+                midY_c = (y0_c + y1_c) / 2.0
+                midY_n = (y0_n + y1_n) / 2.0
+                y_diff = abs(midY_c - midY_n)
+
+                if y_diff < Y_THRESHOLD:
+                    x_gap = x0_n - x1_c
+                    if 0 <= x_gap < X_GAP_THRESHOLD:
+                        unified_text = current_text.rstrip() + " " + text_n.lstrip()
+
+                        if current_label == "image" or label_n == "image":
+                            final_label = "image"
+                            final_chunks = current_chunks or chunks_n
+                        elif current_label == "table" or label_n == "table":
+                            final_label = "table"
+                            final_chunks = current_chunks or chunks_n
+                        else:
+                            final_label = "text"
+                            final_chunks = []
+
+                        merged_font_size = max(current_font_size, next_line["font_size"])
+                        font_size_sum += merged_font_size - current_font_size - next_line["font_size"]
+                        entry_count -= 1
+
+                        # The merged line stays current and may merge again with the one after
+                        current = {
+                            "text": unified_text,
+                            "label": final_label,
+                            "x0": x0_c,
+                            "y0": min(y0_c, y0_n),
+                            "x1": x1_n,
+                            "y1": max(y1_c, y1_n),
+                            "related_chunks": final_chunks,
+                            "font_size": merged_font_size,
+                            "is_bold": current_bold or next_line["is_bold"]
+                        }
+                        next_index += 1
+                        continue
+
+            merged_lines.append((current_text, current_label, current_chunks))
+
+            # Explicit paragraph break after bold or large-font headers
+            if style_breaks and (current_bold or current_font_size > 1.0 + font_size_sum / entry_count):
+                merged_lines.append((PARA_MARKER, "text", []))
 
+            if next_index < n:
+                gap = line_entries[next_index]["y0"] - current["y1"]
+                if gap >= PARA_GAP_THRESHOLD:
+                    merged_lines.append((PARA_MARKER, "text", []))
+
+            prev_entry = current
+            if next_index < n:
+                current = line_entries[next_index]
+                next_index += 1
+            else:
+                current = None
+        return merged_lines
+
+    def assemble_merged_lines_orig(self, line_entries: list[dict]) -> list[tuple[str, str, list[Chunk]]]:
+        """
+        Original merge loop, kept for regression checks of assemble_merged_lines.
+        Deletes merged entries from the list and re-averages font sizes on every
+        line, so it is quadratic in the number of lines.
+        """
+        Y_THRESHOLD = 2.0  
+        X_GAP_THRESHOLD = 15.0
+        PARA_GAP_THRESHOLD = 8.0  
+        PARA_MARKER = "<PARA_BREAK>"
 
         # Improved merging with bold/size-based paragraph breaks
         merged_lines: list[tuple[str, str, List[Chunk]]] = []
@@ -806,6 +1808,47 @@ class PDFChunker:
         print("\n=== END DEBUG ===\n")
 
     def chunk_paragraph_by_sentence(self, paragraph_lines: list[str], max_tokens: int = 100) -> list[str]:
+        return self.chunk_paragraphs_by_sentence([paragraph_lines], max_tokens)[0]
+
+    def chunk_paragraphs_by_sentence(
+        self,
+        paragraphs: list[list[str]],
+        max_tokens: Optional[int] = None
+    ) -> list[list[str]]:
+        """
+        Sentence chunks for several paragraphs, with one tokenizer batch for all
+        of their sentences:
+        1) Join each paragraph's lines and split into sentences by punctuation + whitespace.
+        2) Split any sentence longer than max_tokens on token boundaries ("v1"
+           keeps it whole in a chunk of its own, like the V1 chunker).
+        3) Pack sentences into chunks of up to max_tokens, with overlap_tokens overlap.
+        """
+        max_tokens = max_tokens or self.max_tokens
+        split_long_sentences = self.strategy != "v1"
+        paragraph_sentences: list[list[str]] = []
+        for paragraph_lines in paragraphs:
+            joined_text = " ".join(paragraph_lines).strip()
+            sentences = (" ".join(sent.split()) for sent in SENTENCE_SPLIT_RE.split(joined_text))
+            paragraph_sentences.append([sent for sent in sentences if sent])
+
+        counts = iter(self.tokenizer.count_batch([sent for sentences in paragraph_sentences for sent in sentences]))
+        paragraph_chunks: list[list[str]] = []
+        for sentences in paragraph_sentences:
+            units: list[str] = []
+            unit_counts: list[int] = []
+            for sent in sentences:
+                count = next(counts)
+                if split_long_sentences and count > max_tokens:
+                    pieces = self.tokenizer.split(sent, max_tokens)
+                    units.extend(pieces)
+                    unit_counts.extend(self.tokenizer.count_batch(pieces))
+                else:
+                    units.append(sent)
+                    unit_counts.append(count)
+            paragraph_chunks.append(pack_sentences(units, unit_counts, max_tokens, self.overlap_tokens))
+        return paragraph_chunks
+
+    def chunk_paragraph_by_sentence_orig(self, paragraph_lines: list[str], max_tokens: int = 100) -> list[str]:
         """
         A simplified approach:
         1) Join lines into one string.
@@ -838,20 +1881,245 @@ class PDFChunker:
 
         return chunks
 
-    def extract_document_chunks(self) -> tuple[list[Chunk], dict[int, Chunk]]:
-        
-        def print_lines_with_label(page_num: int, page_lines: list[tuple[str, str]]) -> None:
-            print(f"\n--- 🚀 DEBUG: Page {page_num} raw lines ---")
-            for idx, (text, label, _) in enumerate(page_lines):
-                print(f"  Raw line {idx}: '{text}' (Label: {label})")
+    def debug_print_lines_with_label(self, page_num: int, page_lines: list[tuple[str, str, list[Chunk]]]) -> None:
+        print(f"\n--- 🚀 DEBUG: Page {page_num} raw lines ---")
+        for idx, (text, label, _) in enumerate(page_lines):
+            print(f"  Raw line {idx}: '{text}' (Label: {label})")
+
+    def get_page_image_path(self, page_num: int) -> str:
+        return os.path.join(self.output_dir, f"page_{page_num}.png")
+
+    def render_page_image(self, page: fitz.Page) -> str:
+        page_image_path = self.get_page_image_path(page.number)
+        page.get_pixmap().save(page_image_path)
+        return page_image_path
+
+    def classify_page(self, page: fitz.Page) -> str:
+        """
+        Cheap page classification that runs before any text extraction. A page
+        can only show text through a font in its resources (or in a form it
+        draws), so a page without fonts has no text spans: "scan" when its
+        images cover at least SCAN_MIN_IMAGE_COVERAGE of the page, "images"
+        for other pages with images, "blank" otherwise. Pages with fonts are
+        "text", including scans with an OCR text layer.
+        """
+        if page.get_fonts(full=True):
+            return "text"
+        page_images = self.doc_image_chunksmap.get(page.number)
+        if page_images is None:
+            page_images = self.get_imagechunkmap_for_page(page.number, save_images=False)
+        if not page_images:
+            return "blank"
+        page_area = page.rect.width * page.rect.height
+        image_area = sum(
+            max(0.0, x1 - x0) * max(0.0, y1 - y0)
+            for (x0, y0, x1, y1) in (c.blobs[0].bbox for c in page_images.values() if c.blobs[0].bbox)
+        )
+        return "scan" if page_area > 0 and image_area / page_area >= SCAN_MIN_IMAGE_COVERAGE else "images"
+
+    def analyze_textless_page(self, page: fitz.Page) -> PageAnalysis:
+        """Fast path for pages without text: just the page image; image chunks are added in iter_document_chunks."""
+        return PageAnalysis(page.number, self.get_analysis_page_image(page), [], [])
+
+    def get_analysis_page_image(self, page: fitz.Page) -> Optional[str]:
+        if self.page_images == "eager":
+            return self.render_page_image(page)
+        return None
+
+    def analyze_page(self, page: fitz.Page) -> PageAnalysis:
+        """
+        Per-page work that does not depend on any other page: line extraction,
+        table detection, page render and paragraph splitting. Chunk ids are
+        assigned later, in iter_document_chunks, so this can run in a worker process.
+        Pages without text (scans, figure-only and blank pages) skip the line
+        pipeline.
+        """
+        page_num = page.number
+        page_kind = self.classify_page(page)
+        if page_kind != "text":
+            if self.debug:
+                print(f"\n--- 🚀 DEBUG: Page {page_num+1} has no text ({page_kind}), fast path ---")
+            return self.analyze_textless_page(page)
+
+        line_entries = self.extract_line_entries(page)
+        tables = []
+        if self.tables and self.is_table_like(line_entries, page.rect.width):
+            tables = self.extract_page_tables(page_num)
+            if self.debug:
+                print(f"\n--- 🚀 DEBUG: Page {page_num} tables ---")
+                self.print_tables(tables)
+
+        page_lines_with_labels = self.assemble_merged_lines(line_entries)
+        if page_lines_with_labels and page_lines_with_labels[-1][0].strip().isdigit():
+            page_lines_with_labels.pop()
+
+        if self.debug:
+            print(f"\n--- 🚀 DEBUG: Page {page_num+1} ---")
+            self.debug_print_lines_with_label(page_num, page_lines_with_labels)
+
+        page_image_path = self.get_analysis_page_image(page)
+
+        # paragraphs using the <PARA_BREAK> markers.
+        paragraphs= self.split_paragraphs(page_lines_with_labels)
+        if self.debug:
+            print(f"\n--- 🚀 DEBUG: Page {page_num} paragraphs ---")
+            self.debug_print_paragraphs(paragraphs)
+
+        all_paragraph_texts = self.merge_single_line_headings(paragraphs)
+        return PageAnalysis(page_num, page_image_path, all_paragraph_texts, tables)
+
+    def iter_page_analyses_parallel(self, workers: int, page_nums: Optional[list[int]] = None) -> Iterator[PageAnalysis]:
+        """
+        Fan pages out to a process pool. Each worker opens the PDF once and
+        returns page analyses whose image references are image names; those are
+        mapped back onto this process's image chunks here, in page order.
+        """
+        if page_nums is None:
+            page_nums = list(range(len(self.get_session().doc)))
+        chunksize = max(1, len(page_nums) // (workers * 4))
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_init_page_worker,
+            initargs=(self.file_path, str(self.output_dir.parent), self.debug, self.page_images, str(self.image_cache_dir), self.tables, self.profile is not None),
+        ) as pool:
+            for analysis in pool.map(_analyze_page_in_worker, page_nums, chunksize=chunksize):
+                if self.profile is not None and analysis.profile is not None:
+                    self.profile.merge(analysis.profile)
+                yield self.resolve_image_refs(analysis)
+
+    def resolve_image_refs(self, analysis: PageAnalysis) -> PageAnalysis:
+        """Map image names in an analysis made elsewhere back onto this process's image chunks."""
+        page_images = self.doc_image_chunksmap.get(analysis.page_num, {})
+        analysis.paragraphs = [
+            (para_lines, para_label, [page_images[name] for name in para_refs])
+            for (para_lines, para_label, para_refs) in analysis.paragraphs
+        ]
+        return analysis
+
+    def iter_page_analyses(self) -> Iterator[PageAnalysis]:
+        """
+        Page analyses in page order: taken from the chunk cache for unchanged
+        pages, computed here or by -workers processes for the rest.
+        """
+        doc = self.get_session().doc
+        pending = [page_num for page_num in range(len(doc)) if page_num not in self.reused_page_records]
+        if self.workers > 1 and len(pending) > 1:
+            fresh = self.iter_page_analyses_parallel(self.workers, pending)
+        else:
+            fresh = (self.analyze_page(doc[page_num]) for page_num in pending)
+
+        for page_num in range(len(doc)):
+            # Image chunks of this page only; caption lookup and image refs need them
+            page_images = self.load_page_images(page_num)
+            record = self.reused_page_records.get(page_num)
+            if record is not None:
+                analysis = self.resolve_image_refs(PageAnalysis(
+                    page_num,
+                    record["pageImagePath"],
+                    [(para_lines, para_label, para_refs) for (para_lines, para_label, para_refs) in record["paragraphs"]],
+                    [(table_bbox, table_rows) for (table_bbox, table_rows) in record["tables"]]
+                ))
+            else:
+                analysis = next(fresh)
+            if self.chunk_cache is not None:
+                # Snapshot before extract_document_chunks merges carry-over text into it
+                self.page_records[page_num] = {
+                    "pageImagePath": analysis.page_image_path,
+                    "tables": analysis.tables,
+                    "paragraphs": [
+                        (para_lines, para_label, [c.blobs[0].img_name for c in para_chunks])
+                        for (para_lines, para_label, para_chunks) in analysis.paragraphs
+                    ],
+                    "imageIds": [c.id for c in page_images.values()],
+                    "imagePaths": [c.blobs[0].img_path for c in page_images.values() if c.blobs[0].img_path]
+                }
+            yield analysis
+
+    def hash_page(self, doc: fitz.Document, page_num: int) -> str:
+        """Fingerprint of what analyze_page reads: page box, content streams and images."""
+        page = doc[page_num]
+        digest = hashlib.sha256(repr(tuple(page.rect)).encode("utf-8"))
+        for xref in page.get_contents():
+            digest.update(doc.xref_stream_raw(xref) or b"")
+        for img in page.get_images(full=True):
+            digest.update(self.get_image_digest(doc, img[0]).encode("utf-8"))
+            digest.update(repr(page.get_image_rects(img[0])).encode("utf-8"))
+        return digest.hexdigest()
+
+    def prepare_page_reuse(self) -> None:
+        """
+        Compare page hashes with the last cached run of this file. Unchanged pages
+        reuse their analysis; they also get their previous chunk ids back when
+        the page before is unchanged too, since a paragraph can carry over.
+        """
+        doc = self.get_session().doc
+        self.page_hashes = [self.hash_page(doc, page_num) for page_num in range(len(doc))]
+        previous = self.chunk_cache.load_previous(self.file_path, self.options_key) if self.chunk_cache else None
+        if previous is None:
+            return
+
+        previous_pages = previous["pages"]
+        for page_num, page_hash in enumerate(self.page_hashes):
+            if page_num >= len(previous_pages) or previous_pages[page_num]["hash"] != page_hash:
+                continue
+            record = previous_pages[page_num]
+            if self.page_images == "eager" and not os.path.exists(record["pageImagePath"] or ""):
+                continue
+            self.reused_page_records[page_num] = record
+            if page_num == 0 or (page_num - 1) in self.reused_page_records:
+                self.reused_page_ids[page_num] = record["ids"]
+
+    def page_id_source(self, page_num: int) -> Callable[..., IdType]:
+        """
+        Id generator for one page's chunks, called with the chunk's position on the
+        page. Pages that keep their ids replay the cached ones where they are still valid.
+        """
+        reused = iter(self.reused_page_ids.get(page_num, ()))
+        used = self.page_ids_used.setdefault(page_num, [])
+        def next_id(*path: Union[int, str]) -> IdType:
+            chunk_id = next(reused, None) or self.new_chunk_id(page_num, *path)
+            used.append(chunk_id)
+            return chunk_id
+        return next_id
+
+    def extract_document_chunks(
+        self,
+        page_analyses: Optional[Iterable[PageAnalysis]] = None
+    ) -> tuple[list[Chunk], dict[int, Chunk]]:
+        chunks: list[Chunk] = []
+        page_chunks: dict[int, Chunk] = {}
+        for page_num, page_group in self.iter_document_chunks(page_analyses):
+            page_chunks[page_num] = page_group[0]
+            chunks.extend(page_group)
+        return chunks, page_chunks
 
+    def iter_document_chunks(
+        self,
+        page_analyses: Optional[Iterable[PageAnalysis]] = None
+    ) -> Iterator[tuple[int, list[Chunk]]]:
+        """
+        Build the chunk tree, yielding (page_num, chunks) once each page is
+        complete; the page chunk comes first. Page analyses are consumed in page
+        order so the carry-over paragraph merge and id assignment stay
+        sequential, whether the analyses were computed here or by worker
+        processes. A page that ends on a carry-over paragraph is held back until
+        the next non-blank page shows where that paragraph goes.
+        """
         carry_over_paragraph: Optional[tuple[list[str], str, list[Chunk]]] = None
+        # Chunks of the carry-over paragraph on the page it came from, emitted there if it is not merged
+        carry_over_chunks: list[Chunk] = []
         def create_chunks_with_headers_carryoverpara(all_paragraph_texts, page_chunk_id, page_num, generate_id, debug=False):
-            nonlocal carry_over_paragraph
+            nonlocal carry_over_paragraph, carry_over_chunks
             chunks = []
             current_headers: List[str] = []
             para_id = 0
 
+            # A blank page passes any carry-over on to the next page
+            if not all_paragraph_texts:
+                return chunks
+
             # If there is a carry-over paragraph, prepend it
             if carry_over_paragraph:
                 first_para_lines, first_para_label, first_para_chunks = all_paragraph_texts[0]
@@ -863,22 +2131,30 @@ class PDFChunker:
 
                 all_paragraph_texts[0] = (merged_lines, merged_label, merged_chunks)
                 carry_over_paragraph = None  # Clear carry-over after use
+                carry_over_chunks = []
+
+            # One tokenizer batch for all text paragraphs of the page
+            text_paragraph_ids = [idx for idx, (_, para_label, _) in enumerate(all_paragraph_texts) if para_label == "text"]
+            sentence_chunks = dict(zip(
+                text_paragraph_ids,
+                self.chunk_paragraphs_by_sentence([all_paragraph_texts[idx][0] for idx in text_paragraph_ids])
+            ))
 
             for idx, (para_lines, para_label, para_chunks) in enumerate(all_paragraph_texts):
-                header_matches = re.findall(r'\[(.*?)\]:', " ".join(para_lines))
+                header_matches = PARA_HEADER_RE.findall(" ".join(para_lines))
                 if header_matches:
                     current_headers = header_matches.copy()
 
                 if para_label == "text":
-                    splitted_chunks = self.chunk_paragraph_by_sentence(para_lines, max_tokens=200)
+                    splitted_chunks = sentence_chunks[idx]
                     first_blob = True
-                    for chunk_text in splitted_chunks:
+                    for sub_idx, chunk_text in enumerate(splitted_chunks):
                         blob_headers = current_headers if first_blob else header_matches
 
                         if debug:
                             print(f"  Chunk text: {chunk_text}")
 
-                        para_chunk_id = generate_id()
+                        para_chunk_id = generate_id(idx, sub_idx)
                         para_blob = Blob(
                             blob_type="text",
                             content=chunk_text,
@@ -902,7 +2178,7 @@ class PDFChunker:
                     current_headers = header_matches.copy()
 
                 else:
-                    para_chunk_id = generate_id()
+                    para_chunk_id = generate_id(idx, 0)
                     chunk_ids = [c.id for c in para_chunks]
 
                     para_blob = Blob(
@@ -932,7 +2208,9 @@ class PDFChunker:
                 # Set it as carry-over paragraph
                 carry_over_paragraph = (last_paragraph_text, last_label, last_chunks)
                 # Remove last paragraph's chunks from current list as it'll appear in next page again
-                chunks = chunks[:-len(splitted_chunks)]
+                if splitted_chunks:
+                    carry_over_chunks = chunks[-len(splitted_chunks):]
+                    chunks = chunks[:-len(splitted_chunks)]
 
             return chunks
 
@@ -1059,42 +2337,90 @@ class PDFChunker:
                     chunks.append(para_chunk)
                     para_id += 1
             return chunks
-        # ------------------- chunk the file --------------------
-        doc = fitz.open(self.file_path)
-        chunks: list[Chunk] = []
-        page_chunks: dict[int, Chunk] = {}
 
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            page_lines_with_labels = self.get_lines_from_dict(page)
-            if page_lines_with_labels and page_lines_with_labels[-1][0].strip().isdigit():
-                page_lines_with_labels.pop()
-
-            # Extract only text after filtering
-            page_lines = [text for text, _, _ in page_lines_with_labels]
-
-            if self.debug:
-                print(f"\n--- 🚀 DEBUG: Page {page_num+1} ---")
-                print_lines_with_label(page_num, page_lines_with_labels)
+        def create_chunks_v1(all_paragraph_texts, page_chunk_id, page_num, generate_id, debug=False):
+            """The V1 layout: 0-based page numbers, no carry-over paragraphs, no paraHeader."""
+            chunks = []
+            para_id = 0
+            text_paragraph_ids = [idx for idx, (_, para_label, _) in enumerate(all_paragraph_texts) if para_label == "text"]
+            sentence_chunks = dict(zip(
+                text_paragraph_ids,
+                self.chunk_paragraphs_by_sentence([all_paragraph_texts[idx][0] for idx in text_paragraph_ids])
+            ))
+            for idx, (para_lines, para_label, para_chunks) in enumerate(all_paragraph_texts):
+                if para_label == "text":
+                    for sub_idx, chunk_text in enumerate(sentence_chunks[idx]):
+                        if debug:
+                            print(f"  Chunk text: {chunk_text}")
+                        para_blob = Blob(
+                            blob_type="text",
+                            content=chunk_text,
+                            start=page_num,
+                            para_id=para_id,
+                            image_chunk_ref=None
+                        )
+                        chunks.append(Chunk(
+                            id=generate_id(idx, sub_idx),
+                            pageid=str(page_num),
+                            blobs=[para_blob],
+                            parentId=page_chunk_id,
+                            children=[]
+                        ))
+                        para_id += 1
+                else:
+                    para_blob = Blob(
+                        blob_type=para_label + "_label",
+                        content=para_lines,
+                        start=page_num,
+                        para_id=para_id,
+                        image_chunk_ref=[c.id for c in para_chunks]
+                    )
+                    chunks.append(Chunk(
+                        id=generate_id(idx, 0),
+                        pageid=str(page_num),
+                        blobs=[para_blob],
+                        parentId=page_chunk_id,
+                        children=[]
+                    ))
+                    para_id += 1
+            return chunks
 
-            page_chunk_id = generate_id()
+        create_paragraph_chunks = create_chunks_v1 if self.strategy == "v1" else create_chunks_with_headers_carryoverpara
+        page_base = 0 if self.strategy == "v1" else 1
+        # ------------------- chunk the file --------------------
+        if page_analyses is None:
+            doc = self.get_session().doc
+            page_analyses = (self.analyze_page(doc[page_num]) for page_num in range(len(doc)))
+
+        # Pages from the one a carry-over paragraph came from up to the page that
+        # takes it; they are yielded once it is clear where the paragraph goes
+        held_pages: list[tuple[int, list[Chunk]]] = []
+        def flush_carry_over() -> None:
+            """Emit a carry-over paragraph that is not continued on the page it came from."""
+            nonlocal carry_over_paragraph, carry_over_chunks
+            origin_chunks = held_pages[0][1]
+            origin_chunks[0].children.extend(c.id for c in carry_over_chunks)
+            origin_chunks.extend(carry_over_chunks)
+            carry_over_paragraph = None
+            carry_over_chunks = []
+
+        for analysis in page_analyses:
+            page_num = analysis.page_num
+            next_id = self.page_id_source(page_num)
+            page_chunk_id = next_id()
             page_chunk = Chunk(
                 id=page_chunk_id,
-                pageid=str(page_num+1),
+                pageid=str(page_num + page_base),
                 blobs=[],
                 children=[]
             )
-            page_chunks[page_num] = page_chunk
-            chunks.append(page_chunk)
-
-            pix = page.get_pixmap()
-            page_image_path = os.path.join(self.output_dir, f"page_{page_num}.png")
-            pix.save(page_image_path)
+            chunks = [page_chunk]
 
             page_image_blob = Blob(
                 blob_type="page_image",
                 start=page_num,
-                img_path=page_image_path
+                img_path=analysis.page_image_path,
+                lazy=self.page_images == "lazy"
             )
             page_chunk.blobs.append(page_image_blob)
             image_chunks = self.doc_image_chunksmap[page_num]
@@ -1103,20 +2429,42 @@ class PDFChunker:
                 page_chunk.children.append(img_chunk.id)
                 chunks.append(img_chunk)
 
-            # paragraphs using the <PARA_BREAK> markers.
-            paragraphs= self.split_paragraphs(page_lines_with_labels)
-            if self.debug:
-                print(f"\n--- 🚀 DEBUG: Page {page_num} paragraphs ---")
-                self.debug_print_paragraphs(paragraphs)
-            
-            all_paragraph_texts = self.merge_single_line_headings(paragraphs)
-            para_chunks = create_chunks_with_headers_carryoverpara(all_paragraph_texts, page_chunk_id, page_num, generate_id, self.debug)
+            for table_idx, (table_bbox, table_rows) in enumerate(analysis.tables):
+                table_blob = Blob(
+                    blob_type="table",
+                    start=page_num + page_base,
+                    content=[" | ".join(row) for row in table_rows],
+                    bbox=table_bbox
+                )
+                table_chunk = Chunk(
+                    id=next_id(f"t{table_idx}"),
+                    pageid=str(page_num + page_base),
+                    blobs=[table_blob],
+                    parentId=page_chunk_id,
+                    children=[]
+                )
+                page_chunk.children.append(table_chunk.id)
+                chunks.append(table_chunk)
+
+            # Only a blank page keeps a paragraph going; a scan or figure page ends it
+            is_blank = not (analysis.paragraphs or analysis.tables or image_chunks)
+            if carry_over_paragraph is not None and not analysis.paragraphs and not is_blank:
+                flush_carry_over()
+
+            para_chunks = create_paragraph_chunks(analysis.paragraphs, page_chunk_id, page_num, next_id, self.debug)
             for para_chunk in para_chunks:
                 page_chunk.children.append(para_chunk.id)
             chunks.extend(para_chunks)
-            
 
-        return chunks, page_chunks
+            held_pages.append((page_num, chunks))
+            if carry_over_paragraph is None:
+                yield from held_pages
+                held_pages = []
+
+        # The document ends on a paragraph without final punctuation
+        if carry_over_paragraph is not None:
+            flush_carry_over()
+        yield from held_pages
     
     def extract_tables_from_page_plumber(self, pdf_path: str, page_num: int) -> list[tuple[list[float], list[list[str]]]]:
         """
@@ -1125,24 +2473,7 @@ class PDFChunker:
         - The first element is the bounding box [x0, y0, x1, y1].
         - The second element is the table content as a list of lists (rows).
         """
-        detected_tables = []
-        
-        with pdfplumber.open(pdf_path) as pdf:
-            if page_num >= len(pdf.pages):
-                return detected_tables  # Return empty if page doesn't exist
-            
-            page = pdf.pages[page_num]
-            tables = page.extract_tables()  # Extract tables
-            
-            for table in tables:
-                # Get the bounding box from table metadata
-                bbox = page.bbox  # Entire page's bbox
-                structured_data = [row for row in table if any(row)]  # Remove empty rows
-                
-                if structured_data:
-                    detected_tables.append((bbox, structured_data))  # Store bbox and table content
-
-        return detected_tables
+        return self.extract_page_tables(page_num)
     
     def extract_tables_from_pdf(self, pdf_path: str) -> dict[int, list[tuple[list[float], list[list[str]]]]]:
         """
@@ -1155,20 +2486,11 @@ class PDFChunker:
         """
         tables_per_page = {}
 
-        with pdfplumber.open(pdf_path) as pdf:
-            for page_num, page in enumerate(pdf.pages):
-                tables = page.extract_tables()  # Extract tables
-                
-                page_tables = []
-                for table in tables:
-                    bbox = page.bbox  # Get page bounding box
-                    structured_data = [row for row in table if any(row)]  # Remove empty rows
-                    
-                    if structured_data:
-                        page_tables.append((bbox, structured_data))  # Store bbox and table content
-
-                if page_tables:
-                    tables_per_page[page_num] = page_tables  # Store tables for this page
+        pdf = self.get_session().plumber_pdf
+        for page_num in range(len(pdf.pages)):
+            page_tables = self.extract_page_tables(page_num)
+            if page_tables:
+                tables_per_page[page_num] = page_tables  # Store tables for this page
 
         return tables_per_page
 
@@ -1190,36 +2512,54 @@ class PDFChunker:
         return chunks
 
     def get_imagechunkmap_for_doc(self) -> dict[int, dict[str, Chunk]]:
-        doc = fitz.open(self.file_path)
-        page_imagechunk_map: dict[int, dict[str, Chunk]] = {}  # NEW: page-index-based dictionary
-
-        for page_num in range(len(doc)):
-            img_chunks = self.extract_imageblobs_from_page(page_num)
-
-            # Initialize the nested dict for this page
-            page_dict: dict[str, Chunk] = {}
-            for img_index, chunk in enumerate(img_chunks):
-                # Build a unique key for the image
-                unique_name = f"image_{page_num}_{img_index}"
-                blob = chunk.blobs[0]
-                blob.img_name = unique_name
-                page_dict[unique_name] = chunk
+        doc = self.get_session().doc
+        return {page_num: self.load_page_images(page_num) for page_num in range(len(doc))}
 
-            page_imagechunk_map[page_num] = page_dict
-        return page_imagechunk_map
-
-    def extract_imageblobs_from_page(self, page_num: int) -> list[Chunk]:
+    def load_page_images(self, page_num: int) -> dict[str, Chunk]:
+        """
+        Extract one page's image chunks, save their images and index them for
+        caption lookup. They stay in doc_image_chunksmap until release_page_images.
+        """
+        page_images = self.get_imagechunkmap_for_page(page_num)
+        reused_record = self.reused_page_records.get(page_num)
+        if reused_record is not None and len(reused_record["imageIds"]) == len(page_images):
+            for img_chunk, img_chunk_id in zip(page_images.values(), reused_record["imageIds"]):
+                img_chunk.id = img_chunk_id
+        self.doc_image_chunksmap[page_num] = page_images
+        # Spatial index for caption lookup, built once per page
+        self.doc_image_index[page_num] = ImageBBoxIndex(page_images.values())
+        return page_images
+
+    def release_page_images(self, page_num: int) -> None:
+        self.doc_image_chunksmap.pop(page_num, None)
+        self.doc_image_index.pop(page_num, None)
+
+    def get_imagechunkmap_for_page(self, page_num: int, save_images: bool = True) -> dict[str, Chunk]:
+        img_chunks = self.extract_imageblobs_from_page(page_num, save_images)
+
+        page_dict: dict[str, Chunk] = {}
+        for img_index, chunk in enumerate(img_chunks):
+            # Build a unique key for the image
+            unique_name = f"image_{page_num}_{img_index}"
+            blob = chunk.blobs[0]
+            blob.img_name = unique_name
+            page_dict[unique_name] = chunk
+        return page_dict
+
+    def extract_imageblobs_from_page(self, page_num: int, save_images: bool = True) -> list[Chunk]:
         chunks = []
-        doc = fitz.open(self.file_path)
+        doc = self.get_session().doc
         page = doc[page_num]
         for img_index, img in enumerate(page.get_images(full=True)):
             xref = img[0]
-            img_rect = doc[page_num].get_image_rects(xref)
+            img_rect = page.get_image_rects(xref)
             bbox = list(img_rect[0]) if img_rect else None
-            img_path = os.path.join(self.output_dir, f"image_{page_num}_{img_index}.png")
-            fitz.Pixmap(doc, xref).save(img_path)
+            if save_images:
+                img_path = self.save_image_xref(doc, xref)
+            else:
+                img_path = self.image_paths_by_xref.get(xref)
             
-            image_chunk_id = generate_id()
+            image_chunk_id = self.new_chunk_id(page_num, f"i{img_index}")
             image_blob = Blob(
                 blob_type="image",
                 start=page_num,
@@ -1233,6 +2573,41 @@ class PDFChunker:
             chunks.append(image_chunk)
         return chunks
     
+    def save_image_xref(self, doc: fitz.Document, xref: int) -> str:
+        """
+        Save an embedded image as PNG into the content-addressed image cache.
+        An xref is saved at most once per document, and an image whose raw
+        stream is already in the cache (same logo in another page or PDF) is not
+        re-encoded or rewritten.
+        """
+        cached_path = self.image_paths_by_xref.get(xref)
+        if cached_path is not None:
+            return cached_path
+
+        img_digest = self.get_image_digest(doc, xref)
+        if img_digest:
+            img_path = os.path.join(self.image_cache_dir, img_digest + ".png")
+        else:
+            img_path = os.path.join(self.output_dir, f"image_xref_{xref}.png")
+
+        if not os.path.exists(img_path):
+            # Write under a temp name first; other -jobs workers may share the cache
+            tmp_path = f"{img_path}.{os.getpid()}.tmp"
+            fitz.Pixmap(doc, xref).save(tmp_path, output="png")
+            os.replace(tmp_path, img_path)
+
+        self.image_paths_by_xref[xref] = img_path
+        return img_path
+
+    def get_image_digest(self, doc: fitz.Document, xref: int) -> str:
+        """sha256 of an image's raw stream, or "" when it has none (e.g. inline images)."""
+        img_digest = self.image_digests_by_xref.get(xref)
+        if img_digest is None:
+            raw_stream = doc.xref_stream_raw(xref)
+            img_digest = hashlib.sha256(raw_stream).hexdigest() if raw_stream else ""
+            self.image_digests_by_xref[xref] = img_digest
+        return img_digest
+
     def getAllImageChunks(self) -> List[Chunk]:
         image_chunks = []
         for page_num in range(len(self.doc_image_chunksmap)):
@@ -1243,14 +2618,15 @@ class PDFChunker:
     
     def extract_image_chunks(self, page_chunks) -> List[Chunk]:
         chunks = []
-        doc = fitz.open(self.file_path)
+        doc = self.get_session().doc
         for page_num in range(len(doc)):
             if page_num not in page_chunks:
                 continue
             page_chunk = page_chunks[page_num]
-            for img_index, img in enumerate(doc[page_num].get_images(full=True)):
+            page = doc[page_num]
+            for img_index, img in enumerate(page.get_images(full=True)):
                 xref = img[0]
-                img_rect = doc[page_num].get_image_rects(xref)
+                img_rect = page.get_image_rects(xref)
                 bbox = list(img_rect[0]) if img_rect else None
                 img_path = os.path.join(self.output_dir, f"image_{page_num}_{img_index}.png")
                 fitz.Pixmap(doc, xref).save(img_path)
@@ -1268,35 +2644,224 @@ class PDFChunker:
                 chunks.append(image_chunk)
         return chunks
 
-    def chunkify(self) -> ChunkedFile:
-        with pdfplumber.open(self.file_path) as pdf:
-            self.doc_image_chunksmap = self.get_imagechunkmap_for_doc()
-            doc_chunks, page_chunks = self.extract_document_chunks()
-            if self.debug:
-                self.debug_print_lines(doc_chunks)
-        all_chunks = doc_chunks
-        return all_chunks
+    def iter_chunk_groups(self) -> Iterator[tuple[int, list[Chunk]]]:
+        """
+        Chunk the whole document, yielding each page's chunks as soon as the page
+        is done. Pages are analyzed one at a time and a page's image chunks are
+        extracted just before it and dropped once it is yielded, so memory does
+        not grow with the page count (with the chunk cache on, the small per-page
+        records for the cache entry are kept until the end).
+        """
+        # One document session is shared by every extractor for the whole run
+        try:
+            self.get_session()
+            if self.chunk_cache is not None:
+                self.prepare_page_reuse()
+            self.doc_image_chunksmap = {}
+            self.doc_image_index = {}
+            for page_num, page_group in self.iter_document_chunks(self.iter_page_analyses()):
+                if self.debug:
+                    self.debug_print_lines(page_group)
+                yield page_num, page_group
+                self.release_page_images(page_num)
+        finally:
+            self.close_session()
+
+    def iter_chunks(self) -> Iterator[Chunk]:
+        """
+        Stream the document's chunks in output order, page by page: the page
+        chunk, then its image, table and paragraph chunks. Nothing is kept
+        after a page is yielded, so this suits very large PDFs.
+        """
+        for _, page_group in self.iter_chunk_groups():
+            yield from page_group
 
-    def save_json(self, output_path: str) -> list[Chunk] | ErrorItem:
-        all_chunks = self.chunkify()
-        if (all_chunks is None) or isinstance(all_chunks, ErrorItem):
-            return all_chunks
-        chunked_file = ChunkedFile(self.file_path, all_chunks)
-        with open(output_path, "w") as f:
-            json.dump(chunked_file, f, default=custom_json, indent=2)
+    def chunkify(self) -> list[Chunk]:
+        return list(self.iter_chunks())
+
+    def load_cached_chunks(self, output_path: str, keep_chunks: bool, indent: Optional[int]) -> Optional[list[Chunk]]:
+        """
+        Write output_path from a previous run on identical content and options,
+        if it is still valid. Returns None on a cache miss.
+        """
+        assert self.chunk_cache is not None
+        entry = self.chunk_cache.load(self.get_file_hash(), self.options_key)
+        if entry is None:
+            return None
+        if any(not os.path.exists(img_path) for img_path in entry["imagePaths"]):
+            return None
+        if self.page_images == "eager" and any(not os.path.exists(page["pageImagePath"] or "") for page in entry["pages"]):
+            return None
+        chunks_path = self.chunk_cache.chunks_path(entry["fileHash"], self.options_key, self.output_format)
+        if not os.path.exists(chunks_path):
+            return None
+
+        same_file = entry["fileName"] == self.file_path
+        try:
+            if same_file and entry["indent"] == indent:
+                # Byte-identical to what a fresh run would write
+                shutil.copyfile(chunks_path, output_path)
+                self.chunk_count = entry["chunkCount"]
+                if not keep_chunks:
+                    return []
+                return read_chunked_file(output_path).chunks
+            cached_chunks = read_chunked_file(chunks_path).chunks
+        except OSError:
+            # Pruned by another -jobs worker since the checks above
+            return None
+        self.chunk_count = entry["chunkCount"]
+        if not same_file and self.id_mode == "timestamp":
+            # Content ids are shared by identical copies; timestamp ids are per file
+            rekey_chunks(cached_chunks, lambda _: generate_id())
+        with OUTPUT_WRITERS[self.output_format](output_path, self.file_path, indent) as writer:
+            writer.write_chunks(cached_chunks)
+        return cached_chunks if keep_chunks else []
+
+    def store_cached_chunks(self, output_path: str, indent: Optional[int]) -> None:
+        assert self.chunk_cache is not None and self.file_hash is not None
+        pages = []
+        for page_num, page_hash in enumerate(self.page_hashes):
+            record = self.page_records[page_num]
+            pages.append({
+                "hash": page_hash,
+                "pageImagePath": record["pageImagePath"],
+                "paragraphs": record["paragraphs"],
+                "tables": record["tables"],
+                "ids": self.page_ids_used.get(page_num, []),
+                "imageIds": record["imageIds"]
+            })
+        image_paths = [img_path for record in self.page_records.values() for img_path in record["imagePaths"]]
+        self.chunk_cache.store(self.file_path, self.options_key, {
+            "version": CHUNKER_VERSION,
+            "fileHash": self.file_hash,
+            "fileName": self.file_path,
+            "indent": indent,
+            "format": self.output_format,
+            "chunkCount": self.chunk_count,
+            "imagePaths": sorted(set(image_paths)),
+            "pages": pages
+        }, output_path)
+
+    def save_json(self, output_path: str, keep_chunks: bool = True, indent: Optional[int] = None) -> list[Chunk] | ErrorItem:
+        """
+        Chunk the PDF and write its ChunkedFile in the chunker's output format,
+        streaming each page's chunks to output_path as soon as the page is done. With keep_chunks=False the
+        chunks are dropped once written and an empty list is returned; chunk_count
+        has the number written either way.
+        """
+        if self.chunk_cache is not None:
+            cached_chunks = self.load_cached_chunks(output_path, keep_chunks, indent)
+            if cached_chunks is not None:
+                return cached_chunks
+
+        all_chunks: list[Chunk] = []
+        with OUTPUT_WRITERS[self.output_format](output_path, self.file_path, indent) as writer:
+            if self.profile is not None:
+                writer.write = self.profile.wrap(f"{self.output_format}_write", writer.write)
+            for _, page_group in self.iter_chunk_groups():
+                writer.write_chunks(page_group)
+                if keep_chunks:
+                    all_chunks.extend(page_group)
+        self.chunk_count = writer.count
+        if self.chunk_cache is not None:
+            self.store_cached_chunks(output_path, indent)
         return all_chunks
     
+# Per-process state for -workers page fan-out
+_worker_chunker: Optional[PDFChunker] = None
+
+def _init_page_worker(
+    file_path: str,
+    output_dir: str,
+    debug: bool,
+    page_images: str,
+    image_cache_dir: str,
+    tables: bool,
+    profile: bool
+) -> None:
+    global _worker_chunker
+    # Worker chunk ids are discarded (the parent assigns them), so skip hashing the file
+    _worker_chunker = PDFChunker(
+        file_path,
+        output_dir,
+        debug,
+        page_images=page_images,
+        image_cache_dir=image_cache_dir,
+        id_mode="timestamp",
+        tables=tables,
+        profile=profile
+    )
+    _worker_chunker.get_session()
+
+def _analyze_page_in_worker(page_num: int) -> PageAnalysis:
+    chunker = _worker_chunker
+    assert chunker is not None
+    # Image files are written by the parent; the worker only needs names and bboxes
+    chunker.doc_image_chunksmap = {page_num: chunker.get_imagechunkmap_for_page(page_num, save_images=False)}
+    chunker.doc_image_index = {}
+    if chunker.profile is not None:
+        chunker.profile.reset()  # report this page only
+    analysis = chunker.analyze_page(chunker.get_session().doc[page_num])
+    if chunker.profile is not None:
+        analysis.profile = chunker.profile.to_dict()
+    analysis.paragraphs = [
+        (para_lines, para_label, [c.blobs[0].img_name for c in para_chunks])
+        for (para_lines, para_label, para_chunks) in analysis.paragraphs
+    ]
+    return analysis
+
 def ensure_directory_exists(directory: str) -> str:
     """Ensure the specified directory exists, creating it if necessary."""
     if not os.path.exists(directory):
         os.makedirs(directory)
     return directory
     
-def parse_args(args):
+@dataclass
+class ChunkerOptions:
+    """Command-line options for the chunker."""
+    debug: bool = False
+    workers: int = 1        # processes per file, for page-parallel chunking
+    jobs: int = 1           # files chunked concurrently
+    ndjson: bool = False    # emit one JSON line per finished file
+    server: bool = False    # serve JSON-RPC chunk requests on stdin/stdout
+    indent: Optional[int] = None    # -indent N pretty-prints the -chunked.json file; compact by default
+    stdout_chunks: bool = True      # False (-no-stdout-chunks): print a ChunkedFileSummary, chunks stay on disk
+    page_images: str = "lazy"               # none | lazy | eager page renders
+    image_cache_dir: Optional[str] = None   # shared embedded-image cache, default OUTPUT_FOLDER/.image-cache
+    chunk_cache: bool = True                # reuse results for unchanged files/pages, OUTPUT_FOLDER/.chunk-cache
+    chunk_cache_size_mb: int = CHUNK_CACHE_SIZE_MB  # -cache-size MB: least recently used entries are removed above this
+    id_mode: str = "content"                # content (deterministic) | timestamp (legacy) chunk ids
+    tables: bool = True                     # pdfplumber tables on table-like pages
+    profile: bool = False                   # -profile or PDFCHUNKER_PROFILE=1: write FILE-profile.json timings
+    tokenizer: str = "words"                # words | tiktoken[:ENCODING], measure for -max-tokens
+    max_tokens: int = 200                   # tokens per text chunk
+    overlap_tokens: int = 0                 # -overlap N: tokens of trailing sentences repeated in the next chunk
+    output_format: str = "json"             # -format json | msgpack | parquet for the FILE-chunked.* output
+    strategy: str = "v2"                    # -strategy v1 | v2 chunk layout, see CHUNKER_STRATEGIES
+
+    @classmethod
+    def for_strategy(cls, strategy: str) -> "ChunkerOptions":
+        """Defaults for a strategy; v1 also renders every page and skips tables, like the V1 chunker."""
+        if strategy == "v1":
+            return cls(strategy="v1", page_images="eager", tables=False)
+        return cls(strategy=strategy)
+
+def get_int_arg(args, name: str, default: int) -> int:
+    if name in args:
+        value_index = args.index(name) + 1
+        if value_index < len(args):
+            return max(1, int(args[value_index]))
+    return default
+
+def parse_args(args, strategy: str = "v2"):
     """Parse command-line arguments for -files and -outdir."""
     input_files = []
     output_folder = None
-    debug = False
+    if "-strategy" in args:
+        strategy_index = args.index("-strategy") + 1
+        if strategy_index < len(args) and args[strategy_index] in CHUNKER_STRATEGIES:
+            strategy = args[strategy_index]
+    options = ChunkerOptions.for_strategy(strategy)
 
     if "-files" in args:
         files_index = args.index("-files") + 1
@@ -1310,49 +2875,327 @@ def parse_args(args):
             output_folder = ensure_directory_exists(os.path.abspath(args[outdir_index]))
 
     if "-debug" in args:
-        debug = True
-
-    return input_files, output_folder, debug
+        options.debug = True
+
+    if "-ndjson" in args:
+        options.ndjson = True
+
+    if "-server" in args:
+        options.server = True
+
+    if "-no-stdout-chunks" in args:
+        options.stdout_chunks = False
+
+    if "-indent" in args:
+        options.indent = get_int_arg(args, "-indent", 2)
+
+    if "-no-cache" in args:
+        options.chunk_cache = False
+
+    options.chunk_cache_size_mb = get_int_arg(args, "-cache-size", options.chunk_cache_size_mb)
+
+    if "-no-tables" in args:
+        options.tables = False
+
+    if "-tokenizer" in args:
+        tokenizer_index = args.index("-tokenizer") + 1
+        if tokenizer_index < len(args):
+            options.tokenizer = args[tokenizer_index]
+
+    if "-overlap" in args:
+        overlap_index = args.index("-overlap") + 1
+        if overlap_index < len(args):
+            options.overlap_tokens = max(0, int(args[overlap_index]))
+
+    options.max_tokens = get_int_arg(args, "-max-tokens", options.max_tokens)
+
+    if "-profile" in args or os.environ.get("PDFCHUNKER_PROFILE", "") not in ("", "0"):
+        options.profile = True
+
+    if "-format" in args:
+        format_index = args.index("-format") + 1
+        if format_index < len(args):
+            options.output_format = args[format_index]
+
+    if "-page-images" in args:
+        mode_index = args.index("-page-images") + 1
+        if mode_index < len(args) and args[mode_index] in PAGE_IMAGE_MODES:
+            options.page_images = args[mode_index]
+
+    if "-ids" in args:
+        mode_index = args.index("-ids") + 1
+        if mode_index < len(args) and args[mode_index] in ID_MODES:
+            options.id_mode = args[mode_index]
+
+    if "-image-cache" in args:
+        cache_index = args.index("-image-cache") + 1
+        if cache_index < len(args):
+            options.image_cache_dir = ensure_directory_exists(os.path.abspath(args[cache_index]))
+
+    options.workers = get_int_arg(args, "-workers", options.workers)
+    options.jobs = get_int_arg(args, "-jobs", options.jobs)
+
+    return input_files, output_folder, options
+
+def make_chunker(file_path: str, output_folder: str, options: ChunkerOptions) -> PDFChunker:
+    return PDFChunker(
+        file_path,
+        output_folder,
+        options.debug,
+        options.workers,
+        page_images=options.page_images,
+        image_cache_dir=options.image_cache_dir,
+        chunk_cache_dir=os.path.join(output_folder, ".chunk-cache") if options.chunk_cache else None,
+        chunk_cache_size_mb=options.chunk_cache_size_mb,
+        id_mode=options.id_mode,
+        tables=options.tables,
+        profile=options.profile,
+        tokenizer=options.tokenizer,
+        max_tokens=options.max_tokens,
+        overlap_tokens=options.overlap_tokens,
+        output_format=options.output_format,
+        strategy=options.strategy
+    )
+
+def chunk_pdf(file_path: str, options: Optional[ChunkerOptions] = None, output_folder: str = "output") -> Iterator[Chunk]:
+    """
+    In-process API: the chunks of one PDF, streamed page by page. Embedded
+    images and page renders are written under output_folder; no -chunked
+    file is written and the chunk cache is not used.
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python3 -X utf8 pdfChunker.py -files FILE [FILE] ... -outdir OUTPUT_FOLDER")
-        return 2
+        for chunk in chunk_pdf("paper.pdf", ChunkerOptions.for_strategy("v1")):
+            ...
+    """
+    options = replace(options or ChunkerOptions(), chunk_cache=False)
+    return make_chunker(file_path, output_folder, options).iter_chunks()
+
+def chunk_file(filename: str, output_folder: str, options: ChunkerOptions) -> ErrorItem | ChunkedFile | ChunkedFileSummary:
+    """Chunk one PDF, saving its JSON in output_folder. Runs in a pool worker when -jobs > 1."""
+    if not os.path.exists(filename):
+        return ErrorItem(f"File not found: {filename}", filename)
+
+    try:
+        # Ensure it's a PDF before processing
+        if not filename.lower().endswith(".pdf"):
+            return ErrorItem(f"Invalid file type: {filename}", filename)
+
+        # Process PDF and save JSON output in output_folder
+        chunker = make_chunker(filename, output_folder, options)
+        output_path = chunked_output_path(chunker.output_dir, filename, options.output_format)
+        result = chunker.save_json(output_path, keep_chunks=options.stdout_chunks, indent=options.indent)
+        if chunker.profile is not None:
+            chunker.profile.save(os.path.join(chunker.output_dir, os.path.basename(filename) + "-profile.json"), filename)
+
+        if isinstance(result, ErrorItem):
+            return result
+        if not options.stdout_chunks:
+            return ChunkedFileSummary(filename, output_path, chunker.chunk_count)
+        chunks = [chunk for chunk in result if chunk.blobs]
+        return ChunkedFile(filename, chunks)
+
+    except Exception as err:
+        # e.g. a corrupt PDF (pymupdf.FileDataError); the rest of the batch goes on
+        return ErrorItem(str(err), filename)
+
+def iter_chunked_files(
+    input_files: list[str],
+    output_folder: str,
+    options: ChunkerOptions,
+    pool: Optional[ProcessPoolExecutor] = None
+) -> Iterator[tuple[int, ErrorItem | ChunkedFile | ChunkedFileSummary]]:
+    """
+    Yield (input index, result) for each file as soon as it is done.
+    With -jobs N, files are chunked by a bounded process pool and come back in completion order.
+    A caller that chunks many batches (e.g. -server) can pass its own long-lived pool.
+    """
+    if pool is None and (options.jobs <= 1 or len(input_files) <= 1):
+        for index, filename in enumerate(input_files):
+            yield index, chunk_file(filename, output_folder, options)
+        return
+
+    own_pool = pool is None
+    if pool is None:
+        pool = create_file_pool(min(options.jobs, len(input_files)))
+    try:
+        futures = {}
+        for index, filename in enumerate(input_files):
+            try:
+                futures[pool.submit(chunk_file, filename, output_folder, options)] = (index, filename)
+            except Exception as err:
+                yield index, ErrorItem(f"Chunker failed: {err}", filename)
+        for future in as_completed(futures):
+            index, filename = futures[future]
+            try:
+                yield index, future.result()
+            except Exception as err:
+                yield index, ErrorItem(f"Chunker failed: {err}", filename)
+    finally:
+        if own_pool:
+            pool.shutdown()
+
+def render_page_images(file_path: str, output_folder: str, pages: Optional[list[int]] = None) -> list[str]:
+    """Render page images on request, for files chunked with -page-images lazy."""
+    chunker = PDFChunker(file_path, output_folder, page_images="eager")
+    try:
+        doc = chunker.get_session().doc
+        page_nums = pages if pages is not None else range(len(doc))
+        return [chunker.render_page_image(doc[page_num]) for page_num in page_nums]
+    finally:
+        chunker.close_session()
+
+def create_file_pool(jobs: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn"))
+
+def serve(options: ChunkerOptions) -> int:
+    """
+    Long-running mode: read JSON-RPC 2.0 requests from stdin, one per line, and
+    answer on stdout, so callers pay interpreter and library startup only once.
+
+      -> {"jsonrpc": "2.0", "id": 1, "method": "chunk", "params": {"files": [...], "outdir": "..."}}
+      <- {"jsonrpc": "2.0", "method": "result", "params": {"id": 1, "item": ChunkedFile | ErrorItem}}  (one per file)
+      <- {"jsonrpc": "2.0", "id": 1, "result": {"count": N}}
+      -> {"jsonrpc": "2.0", "id": 2, "method": "render_pages", "params": {"file": "...", "outdir": "...", "pages": [0, 1]}}
+      <- {"jsonrpc": "2.0", "id": 2, "result": {"paths": [...]} | ErrorItem}
+      -> {"jsonrpc": "2.0", "id": 3, "method": "shutdown"}
+
+    A file that cannot be chunked or rendered is answered with an ErrorItem like
+    any other result; error responses (-32603 etc.) are for requests that cannot
+    be run at all.
+    """
+    # Keep the real stdout for protocol messages only. Everything else written to
+    # fd 1 (debug prints, pool workers) is sent to stderr instead.
+    proto = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    def send(message: dict[str, Any]) -> None:
+        proto.write(json.dumps(message, default=custom_json, separators=(",", ":")) + "\n")
+        proto.flush()
+
+    def send_error(request_id: Any, code: int, message: str) -> None:
+        send({"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}})
+
+    pool = create_file_pool(options.jobs) if options.jobs > 1 else None
+    try:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as err:
+                send_error(None, -32700, f"Parse error: {err}")
+                continue
 
-    input_files, output_folder, debug_mode = parse_args(sys.argv[1:])
-    if not input_files or not output_folder:
-        print("Error: Missing input files or output folder.")
-        return 2
+            request_id = request.get("id")
+            method = request.get("method")
+            params = request.get("params") or {}
+            if method == "shutdown":
+                send({"jsonrpc": "2.0", "id": request_id, "result": None})
+                break
+            if method == "render_pages":
+                if not params.get("file") or not params.get("outdir"):
+                    send_error(request_id, -32602, "Missing file or output folder.")
+                    continue
+                try:
+                    paths = render_page_images(
+                        os.path.abspath(params["file"]),
+                        ensure_directory_exists(os.path.abspath(params["outdir"])),
+                        params.get("pages")
+                    )
+                    send({"jsonrpc": "2.0", "id": request_id, "result": {"paths": paths}})
+                except Exception as err:
+                    send({"jsonrpc": "2.0", "id": request_id, "result": ErrorItem(str(err), params["file"])})
+                continue
+            if method != "chunk":
+                send_error(request_id, -32601, f"Method not found: {method}")
+                continue
 
-    items: list[ErrorItem | ChunkedFile] = []
-    for filename in input_files:
-        if not os.path.exists(filename):
-            items.append(ErrorItem(f"File not found: {filename}", filename))
-            continue
+            input_files = [os.path.abspath(f) for f in params.get("files", [])]
+            outdir = params.get("outdir")
+            if not input_files or not outdir:
+                send_error(request_id, -32602, "Missing input files or output folder.")
+                continue
 
-        try:
-            # Ensure it's a PDF before processing
-            if not filename.lower().endswith(".pdf"):
-                items.append(ErrorItem(f"Invalid file type: {filename}", filename))
+            try:
+                output_folder = ensure_directory_exists(os.path.abspath(outdir))
+            except Exception as err:
+                send_error(request_id, -32603, str(err))
                 continue
 
-            # Process PDF and save JSON output in output_folder
-            chunker = PDFChunker(filename, output_folder, debug_mode)
-            output_json = os.path.join(chunker.output_dir, os.path.basename(filename) + "-chunked.json")
-            result = chunker.save_json(output_json)
+            if pool is not None:
+                try:
+                    pool.submit(int)
+                except BrokenProcessPool:
+                    # A worker died in an earlier request; later requests get a new pool
+                    pool.shutdown(wait=False)
+                    pool = create_file_pool(options.jobs)
+
+            # A file that fails gets an ErrorItem; the other files in the request are still chunked
+            sent: set[int] = set()
+            try:
+                for index, item in iter_chunked_files(input_files, output_folder, options, pool):
+                    send({"jsonrpc": "2.0", "method": "result", "params": {"id": request_id, "item": item}})
+                    sent.add(index)
+            except Exception as err:
+                for index, filename in enumerate(input_files):
+                    if index not in sent:
+                        item = ErrorItem(f"Chunker failed: {err}", filename)
+                        send({"jsonrpc": "2.0", "method": "result", "params": {"id": request_id, "item": item}})
+            send({"jsonrpc": "2.0", "id": request_id, "result": {"count": len(input_files)}})
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        proto.close()
+    return 0
 
-            if isinstance(result, ErrorItem):
-                items.append(result)
-            else:
-                chunks = [chunk for chunk in result if chunk.blobs]
-                items.append(ChunkedFile(filename, chunks))
+def main(strategy: str = "v2"):
+    if len(sys.argv) < 2:
+        print("Usage: python3 -X utf8 pdfChunker.py -files FILE [FILE] ... -outdir OUTPUT_FOLDER [-workers N] [-jobs N] [-ndjson]"
+              " [-page-images none|lazy|eager] [-image-cache DIR] [-no-cache] [-cache-size MB] [-ids content|timestamp]"
+              " [-indent N] [-no-stdout-chunks] [-no-tables] [-profile]"
+              " [-tokenizer words|tiktoken[:ENCODING]] [-max-tokens N] [-overlap N] [-format json|msgpack|parquet]"
+              " [-strategy v1|v2]")
+        print("       python3 -X utf8 pdfChunker.py -server [-workers N] [-jobs N] [-page-images none|lazy|eager]"
+              " [-image-cache DIR] [-no-cache] [-cache-size MB] [-ids content|timestamp] [-indent N] [-no-stdout-chunks]"
+              " [-no-tables] [-profile] [-tokenizer words|tiktoken[:ENCODING]] [-max-tokens N] [-overlap N]"
+              " [-format json|msgpack|parquet] [-strategy v1|v2]")
+        return 2
 
-        except IOError as err:
-            items.append(ErrorItem(str(err), filename))
+    input_files, output_folder, options = parse_args(sys.argv[1:], strategy)
+    try:
+        make_tokenizer(options.tokenizer)
+        require_output_format(options.output_format)
+    except (ValueError, RuntimeError) as err:
+        print(f"Error: {err}")
+        return 2
+
+    if options.server:
+        return serve(options)
+
+    if not input_files or not output_folder:
+        print("Error: Missing input files or output folder.")
+        return 2
 
-    print(json.dumps(items, default=custom_json, indent=2))
+    if options.ndjson:
+        # One line per finished file so callers can start on it right away
+        for _, item in iter_chunked_files(input_files, output_folder, options):
+            print(json.dumps(item, default=custom_json, separators=(",", ":")), flush=True)
+        return 0
+
+    # A JSON array in input order, each item printed as soon as the ones before it are
+    pending: dict[int, ErrorItem | ChunkedFile | ChunkedFileSummary] = {}
+    next_index = 0
+    sys.stdout.write("[")
+    for index, item in iter_chunked_files(input_files, output_folder, options):
+        pending[index] = item
+        while next_index in pending:
+            item_json = json.dumps(pending.pop(next_index), default=custom_json, separators=(",", ":"))
+            sys.stdout.write(item_json if next_index == 0 else "," + item_json)
+            next_index += 1
+    sys.stdout.write("]\n")
     return 0
 
 if __name__ == "__main__":
     exit_code = main()
-    sys.exit(exit_code)
\ No newline at end of file
+    sys.exit(exit_code)
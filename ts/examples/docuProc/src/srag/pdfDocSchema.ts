@@ -16,6 +16,7 @@ export interface Blob {
     bbox?: number[]; // Optional bounding box
     img_name?: string; // Optional image name
     img_path?: string; // Optional image path
+    lazy?: boolean; // page_image not rendered yet; the chunker's render_pages request renders it
     image_chunk_ref?: string[]; // Optional reference to image chunk(s)
     para_id?: number; // Optional Paragraph ID if needed
     paraHeader?: string | string[]; // Optional paragraph header
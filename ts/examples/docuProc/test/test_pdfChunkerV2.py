@@ -0,0 +1,269 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# Unit tests for srag/pdfChunkerV2.py. Run from ts/examples/docuProc:
+#
+#   python3 -m pytest test
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+pytest.importorskip("pymupdf")
+pytest.importorskip("pdfplumber")
+
+SRAG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "srag")
+sys.path.insert(0, SRAG_DIR)
+
+import pdfChunkerV2  # noqa: E402
+
+PAGE_WIDTH = 612
+
+def line_entry(x0: float, y0: float, width: float, text: str) -> dict:
+    return {"text": text, "x0": x0, "y0": y0, "x1": x0 + width, "y1": y0 + 10}
+
+@pytest.fixture
+def chunker(tmp_path):
+    # Chunk ids are keyed on the file's content
+    (tmp_path / "doc.pdf").write_bytes(b"%PDF-1.7")
+    return pdfChunkerV2.PDFChunker(str(tmp_path / "doc.pdf"), str(tmp_path), chunk_cache_dir=str(tmp_path / "cache"))
+
+def test_two_column_prose_is_not_table_like(chunker):
+    # Two columns of wrapped prose, as on the bench corpus "columns" pages
+    prose = "chunk page layout table image caption figure paragraph section model"
+    entries = []
+    for row in range(40):
+        for column_x0 in (54, 315):
+            entries.append(line_entry(column_x0, 80 + row * 11, 243, prose))
+    assert not chunker.is_table_like(entries, PAGE_WIDTH)
+
+def test_grid_of_short_cells_is_table_like(chunker):
+    entries = []
+    for row in range(10):
+        for column in range(4):
+            entries.append(line_entry(58 + column * 126, 200 + row * 18, 40, f"{row * 4 + column:.2f}"))
+    assert chunker.is_table_like(entries, PAGE_WIDTH)
+
+def image_chunk(page_num: int) -> pdfChunkerV2.Chunk:
+    blob = pdfChunkerV2.Blob(blob_type="image", start=page_num, bbox=[0, 0, PAGE_WIDTH, 792], img_name=f"image_{page_num}")
+    return pdfChunkerV2.Chunk(id=f"img{page_num}", pageid=str(page_num), blobs=[blob])
+
+def text_pages(chunker, pages: list) -> dict:
+    """Chunk page analyses with the given text paragraphs; None is a scanned page."""
+    analyses = []
+    for page_num, paragraphs in enumerate(pages):
+        chunker.doc_image_chunksmap[page_num] = {} if paragraphs is not None else {"scan": image_chunk(page_num)}
+        page_paragraphs = [([text], "text", []) for text in paragraphs or []]
+        analyses.append(pdfChunkerV2.PageAnalysis(page_num, None, page_paragraphs))
+    texts = {}
+    for page_num, chunks in chunker.iter_document_chunks(analyses):
+        texts[page_num] = [c.blobs[0].content for c in chunks[1:] if c.blobs[0].blob_type == "text"]
+    return texts
+
+def test_carry_over_paragraph_joins_next_text_page(chunker):
+    texts = text_pages(chunker, [["Intro.", "The model reads"], ["the whole page.", "Done."]])
+    assert texts == {0: ["Intro."], 1: ["The model reads the whole page.", "Done."]}
+
+def test_carry_over_paragraph_skips_blank_page(chunker):
+    texts = text_pages(chunker, [["The model reads"], [], ["the whole page."]])
+    assert texts == {0: [], 1: [], 2: ["The model reads the whole page."]}
+
+def test_carry_over_paragraph_stays_before_scanned_page(chunker):
+    texts = text_pages(chunker, [["The model reads"], None, ["Next section."]])
+    assert texts == {0: ["The model reads"], 1: [], 2: ["Next section."]}
+
+# Heading, bold and large-print lines with no vertical gap between them
+STYLED_LINES = [
+    ("Results", "hebo", 16),
+    ("The model reads every page", "helv", 11),
+    ("and keeps", "helv", 11),
+    ("bold terms", "hebo", 11),
+    ("inside the paragraph.", "helv", 11),
+    (None, None, 0),
+    ("Large print", "helv", 18),
+    ("stays in the next one.", "helv", 11),
+]
+
+def make_styled_pdf(path: str) -> None:
+    doc = pdfChunkerV2.fitz.open()
+    page = doc.new_page()
+    y = 72
+    for text, font, size in STYLED_LINES:
+        if text is None:
+            y += 24
+            continue
+        page.insert_text((72, y), text, fontname=font, fontsize=size)
+        y += size + 1
+    doc.save(path)
+
+def test_v1_only_breaks_paragraphs_on_gaps(tmp_path):
+    pdf_path = str(tmp_path / "styled.pdf")
+    make_styled_pdf(pdf_path)
+    options = pdfChunkerV2.ChunkerOptions.for_strategy("v1")
+    chunks = pdfChunkerV2.chunk_pdf(pdf_path, options, str(tmp_path / "output"))
+    texts = [c.blobs[0].content for c in chunks if c.blobs[0].blob_type == "text"]
+    # Output of the V1 chunker (src/pdfChunker.py before the v1 strategy) on this page
+    assert texts == [
+        "Results The model reads every page and keeps bold terms inside the paragraph.",
+        "Large print stays in the next one.",
+    ]
+
+def test_v1_keeps_long_sentences_whole(tmp_path):
+    chunker = pdfChunkerV2.PDFChunker(str(tmp_path / "doc.pdf"), str(tmp_path), max_tokens=4, strategy="v1")
+    chunks = chunker.chunk_paragraphs_by_sentence([["One two three four five six. Seven."]])
+    assert chunks == [["One two three four five six.", "Seven."]]
+
+def make_batch(tmp_path) -> list[str]:
+    """A good PDF, a truncated copy of it, and the good one again."""
+    good_path = str(tmp_path / "good.pdf")
+    make_styled_pdf(good_path)
+    bad_path = str(tmp_path / "bad.pdf")
+    with open(good_path, "rb") as f:
+        data = f.read()
+    with open(bad_path, "wb") as f:
+        f.write(data[:len(data) // 3])
+    return [good_path, bad_path, good_path]
+
+def test_corrupt_file_does_not_stop_the_batch(tmp_path):
+    files = make_batch(tmp_path)
+    bad_path = files[1]
+
+    results = dict(pdfChunkerV2.iter_chunked_files(files, str(tmp_path / "output"), pdfChunkerV2.ChunkerOptions()))
+
+    assert isinstance(results[0], pdfChunkerV2.ChunkedFile)
+    assert isinstance(results[1], pdfChunkerV2.ErrorItem)
+    assert results[1].fileName == bad_path
+    assert isinstance(results[2], pdfChunkerV2.ChunkedFile)
+
+def test_server_answers_a_failed_file_with_an_error_item(tmp_path):
+    files = make_batch(tmp_path)
+    requests = [
+        {"jsonrpc": "2.0", "id": 1, "method": "chunk", "params": {"files": files, "outdir": str(tmp_path / "output")}},
+        {"jsonrpc": "2.0", "id": 2, "method": "shutdown"},
+    ]
+    server = subprocess.run(
+        [sys.executable, os.path.join(SRAG_DIR, "pdfChunkerV2.py"), "-server"],
+        input="".join(json.dumps(r) + "\n" for r in requests),
+        capture_output=True, text=True, timeout=120
+    )
+    messages = [json.loads(line) for line in server.stdout.splitlines()]
+
+    items = [m["params"]["item"] for m in messages if m.get("method") == "result"]
+    assert [item.get("fileName", item.get("filename")) for item in items] == files
+    assert "error" in items[1] and not any("error" in items[i] for i in (0, 2))
+    assert messages[-2] == {"jsonrpc": "2.0", "id": 1, "result": {"count": 3}}
+
+def test_broken_file_pool_gives_error_items(tmp_path):
+    files = make_batch(tmp_path)
+    pool = pdfChunkerV2.create_file_pool(1)
+    try:
+        # A worker that dies breaks the whole pool
+        with pytest.raises(BrokenProcessPool):
+            pool.submit(os._exit, 1).result(timeout=60)
+        results = dict(pdfChunkerV2.iter_chunked_files(files, str(tmp_path / "output"), pdfChunkerV2.ChunkerOptions(), pool))
+    finally:
+        pool.shutdown()
+
+    assert sorted(results) == [0, 1, 2]
+    assert all(isinstance(item, pdfChunkerV2.ErrorItem) for item in results.values())
+
+def make_text_pdf(path: str, pages: list[str]) -> None:
+    doc = pdfChunkerV2.fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text, fontsize=11)
+    doc.save(path)
+
+def chunk_ids(chunks) -> dict[int, list[str]]:
+    ids: dict[int, list[str]] = {}
+    for chunk in chunks:
+        ids.setdefault(chunk.pageid, []).append(chunk.id)
+    return ids
+
+def test_chunk_ids_do_not_depend_on_the_path(tmp_path):
+    for folder in ("a", "b"):
+        (tmp_path / folder).mkdir()
+    make_text_pdf(str(tmp_path / "a" / "doc.pdf"), ["First page.", "Second page."])
+    shutil.copyfile(tmp_path / "a" / "doc.pdf", tmp_path / "b" / "doc.pdf")
+    ids = [
+        [c.id for c in pdfChunkerV2.chunk_pdf(str(tmp_path / folder / "doc.pdf"), output_folder=str(tmp_path / "output"))]
+        for folder in ("a", "b")
+    ]
+    assert ids[0] == ids[1]
+
+def test_edited_pdf_keeps_ids_of_unchanged_pages(tmp_path):
+    pdf_path = str(tmp_path / "doc.pdf")
+    def save_json() -> dict[int, list[str]]:
+        chunker = pdfChunkerV2.PDFChunker(pdf_path, str(tmp_path / "output"), chunk_cache_dir=str(tmp_path / "cache"))
+        return chunk_ids(chunker.save_json(str(tmp_path / "doc-chunked.json")))
+
+    make_text_pdf(pdf_path, ["First page.", "Second page.", "Third page.", "Fourth page."])
+    before = save_json()
+    make_text_pdf(pdf_path, ["First page.", "Edited second page.", "Third page.", "Fourth page."])
+    after = save_json()
+
+    assert after["1"] == before["1"] and after["4"] == before["4"]
+    # Page 3 could take a paragraph carried over from the edited page 2
+    assert set(after["2"] + after["3"]).isdisjoint(before["2"] + before["3"])
+
+def test_cache_hit_needs_the_page_images(tmp_path):
+    pdf_path = str(tmp_path / "doc.pdf")
+    make_text_pdf(pdf_path, ["First page.", "Second page."])
+    def save_json() -> list:
+        chunker = pdfChunkerV2.PDFChunker(
+            pdf_path, str(tmp_path / "output"), page_images="eager", chunk_cache_dir=str(tmp_path / "cache")
+        )
+        return chunker.save_json(str(tmp_path / "doc-chunked.json"))
+
+    chunks = save_json()
+    page_image_paths = [c.blobs[0].img_path for c in chunks if c.blobs[0].blob_type == "page_image"]
+    shutil.rmtree(tmp_path / "output" / "doc")
+    save_json()
+
+    assert len(page_image_paths) == 2
+    assert all(os.path.exists(path) for path in page_image_paths)
+
+def test_edited_pdf_replaces_its_cache_entry(tmp_path):
+    pdf_path = str(tmp_path / "doc.pdf")
+    cache_dir = tmp_path / "cache"
+    for text in ("First version.", "Second version."):
+        make_text_pdf(pdf_path, [text])
+        chunker = pdfChunkerV2.PDFChunker(pdf_path, str(tmp_path / "output"), chunk_cache_dir=str(cache_dir))
+        chunker.save_json(str(tmp_path / "doc-chunked.json"))
+
+    assert [path.name.split("-")[0] for path in cache_dir.glob("*.chunks.json")] == [chunker.get_file_hash()]
+
+def test_cache_prune_removes_least_recently_used_files(tmp_path):
+    cache = pdfChunkerV2.ChunkCache(str(tmp_path), max_bytes=250)
+    for mtime, name in enumerate(["old.json", "newer.json", "newest.json", "other.json.123.tmp"]):
+        path = tmp_path / name
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (mtime, mtime))
+
+    cache.prune()
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["newer.json", "newest.json", "other.json.123.tmp"]
+
+def test_import_keeps_stdout_clean():
+    # stdout carries only -ndjson lines and -server JSON-RPC messages
+    imported = subprocess.run([sys.executable, "-c", "import pdfChunkerV2"], cwd=SRAG_DIR, capture_output=True, text=True, timeout=120)
+    assert imported.returncode == 0 and imported.stdout == ""
+
+def test_lazy_page_images_have_no_path_until_rendered(tmp_path):
+    pdf_path = str(tmp_path / "doc.pdf")
+    output_folder = str(tmp_path / "output")
+    make_text_pdf(pdf_path, ["First page.", "Second page."])
+
+    chunks = pdfChunkerV2.chunk_pdf(pdf_path, pdfChunkerV2.ChunkerOptions(page_images="lazy"), output_folder)
+    page_blobs = [c.blobs[0] for c in chunks if c.blobs[0].blob_type == "page_image"]
+    assert [blob.to_dict() for blob in page_blobs] == [
+        {"blob_type": "page_image", "start": 0, "lazy": True},
+        {"blob_type": "page_image", "start": 1, "lazy": True},
+    ]
+
+    paths = pdfChunkerV2.render_page_images(pdf_path, output_folder, [blob.start for blob in page_blobs])
+    assert len(paths) == 2 and all(os.path.exists(path) for path in paths)